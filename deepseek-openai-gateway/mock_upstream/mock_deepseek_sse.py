@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
+import asyncio
 import time
-from typing import Dict, Any, Iterable
+from typing import Dict, Any, AsyncIterator
 
+import orjson
 from fastapi import FastAPI, Request
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, ORJSONResponse
 
-app = FastAPI(title="Mock DeepSeek SSE Upstream")
+app = FastAPI(
+    title="Mock DeepSeek SSE Upstream",
+    default_response_class=ORJSONResponse,
+)
 
 
 def build_deepseek_chunk(
@@ -18,9 +22,13 @@ def build_deepseek_chunk(
     role: str | None,
     finish_reason: str | None,
     usage: Dict[str, int] | None = None,
+    created: int | None = None,
 ) -> Dict[str, Any]:
     """
     Build a DeepSeek-style chat.completion.chunk object.
+
+    Pass `created` to reuse one timestamp across a stream instead of
+    reading the clock per chunk.
     """
     delta: Dict[str, Any] = {}
     if content is not None:
@@ -38,7 +46,7 @@ def build_deepseek_chunk(
     obj: Dict[str, Any] = {
         "id": _id,
         "object": "chat.completion.chunk",
-        "created": int(time.time()),
+        "created": int(time.time()) if created is None else created,
         "model": model,
         "system_fingerprint": "fp_mock_123456",
         "choices": [choice],
@@ -51,78 +59,104 @@ def build_deepseek_chunk(
     return obj
 
 
-def normal_stream(_id: str, model: str) -> Iterable[str]:
+def sse_event(obj: Dict[str, Any]) -> bytes:
     """
-    Normal streaming: sends a sequence of DeepSeek-style chunks, then [DONE].
+    Encode one chunk object as an SSE `data:` event (orjson emits UTF-8 directly).
     """
-    # Same sentence as your example, tokenized in a sloppy but illustrative way.
-    tokens = ["", "Hello", "!", " How", " can", " I", " assist", " you", " today", "?"]
+    return b"data: " + orjson.dumps(obj) + b"\n\n"
 
-    # First chunk: empty content but with role=assistant
-    first_chunk = build_deepseek_chunk(
-        _id=_id,
-        model=model,
-        content=tokens[0],
-        role="assistant",
-        finish_reason=None,
-        usage=None,
-    )
-    yield f"data: {json.dumps(first_chunk, ensure_ascii=False)}\n\n"
-    time.sleep(0.05)
 
-    # Middle chunks
-    for t in tokens[1:-1]:
-        chunk = build_deepseek_chunk(
-            _id=_id,
-            model=model,
-            content=t,
-            role="assistant",
-            finish_reason=None,
-            usage=None,
-        )
-        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
-        time.sleep(0.05)
+# Same sentence as your example, tokenized in a sloppy but illustrative way.
+NORMAL_TOKENS = ["", "Hello", "!", " How", " can", " I", " assist", " you", " today", "?"]
 
-    # Last token chunk (before finish)
-    last_token = tokens[-1]
-    last_content_chunk = build_deepseek_chunk(
-        _id=_id,
-        model=model,
-        content=last_token,
-        role="assistant",
-        finish_reason=None,
-        usage=None,
-    )
-    yield f"data: {json.dumps(last_content_chunk, ensure_ascii=False)}\n\n"
-    time.sleep(0.05)
+# Placeholders substituted per request into the pre-serialized templates below.
+_ID_SLOT = b"__ID__"
+_MODEL_SLOT = b"__MODEL__"
+_TS_SLOT = b"__TS__"
 
-    # Final chunk with finish_reason="stop" + usage
-    usage = {
-        "completion_tokens": len(tokens) - 1,
-        "prompt_tokens": 17,
-        "total_tokens": 17 + (len(tokens) - 1),
-    }
-    final_chunk = build_deepseek_chunk(
-        _id=_id,
-        model=model,
-        content="",
-        role=None,
-        finish_reason="stop",
+
+def _chunk_template(
+    content: str,
+    role: str | None,
+    finish_reason: str | None,
+    usage: Dict[str, int] | None = None,
+) -> bytes:
+    """
+    Pre-serialize a chunk with id/model/created left as placeholders.
+    """
+    obj = build_deepseek_chunk(
+        _id=_ID_SLOT.decode(),
+        model=_MODEL_SLOT.decode(),
+        content=content,
+        role=role,
+        finish_reason=finish_reason,
         usage=usage,
     )
-    yield f"data: {json.dumps(final_chunk, ensure_ascii=False)}\n\n"
-    time.sleep(0.02)
+    obj["created"] = _TS_SLOT.decode()
+    # "created" is numeric, so drop the quotes around its placeholder
+    return sse_event(obj).replace(b'"' + _TS_SLOT + b'"', _TS_SLOT)
+
+
+# Every content chunk (first one included) carries role=assistant; the final
+# chunk has empty content, finish_reason="stop" and the usage block.
+_NORMAL_CONTENT_TEMPLATES: list[bytes] = [
+    _chunk_template(t, role="assistant", finish_reason=None) for t in NORMAL_TOKENS
+]
+_NORMAL_FINAL_TEMPLATE: bytes = _chunk_template(
+    "",
+    role=None,
+    finish_reason="stop",
+    usage={
+        "completion_tokens": len(NORMAL_TOKENS) - 1,
+        "prompt_tokens": 17,
+        "total_tokens": 17 + (len(NORMAL_TOKENS) - 1),
+    },
+)
+
+
+async def normal_stream(_id: str, model: str, batch_size: int = 1) -> AsyncIterator[bytes]:
+    """
+    Normal streaming: sends a sequence of DeepSeek-style chunks, then [DONE].
+
+    With batch_size > 1, that many chunks are coalesced into one write
+    (and one delay), which cuts per-event overhead for load testing.
+    """
+    # JSON-escape the per-request values once; [1:-1] strips the quotes.
+    id_b = orjson.dumps(_id)[1:-1]
+    model_b = orjson.dumps(str(model))[1:-1]
+    ts_b = str(int(time.time())).encode()
+
+    def fill(tmpl: bytes) -> bytes:
+        return tmpl.replace(_ID_SLOT, id_b).replace(_MODEL_SLOT, model_b).replace(_TS_SLOT, ts_b)
+
+    # Content chunks: first has empty content, the rest carry one token each
+    buf = bytearray()
+    pending = 0
+    for tmpl in _NORMAL_CONTENT_TEMPLATES:
+        buf += fill(tmpl)
+        pending += 1
+        if pending == batch_size:
+            yield bytes(buf)
+            buf.clear()
+            pending = 0
+            await asyncio.sleep(0.05)
+
+    # Final chunk with finish_reason="stop" + usage (plus any unflushed chunks)
+    buf += fill(_NORMAL_FINAL_TEMPLATE)
+    yield bytes(buf)
+    await asyncio.sleep(0.02)
 
     # Termination line
-    yield "data: [DONE]\n\n"
+    yield b"data: [DONE]\n\n"
 
 
-def stream_with_error(_id: str, model: str) -> Iterable[str]:
+async def stream_with_error(_id: str, model: str) -> AsyncIterator[bytes]:
     """
     Stream a few chunks, then simulate an upstream mid-stream disconnect
     by raising an exception.
     """
     tokens = ["", "Partial", " response", " before", " error"]
+    created = int(time.time())
 
     # First chunk
     first_chunk = build_deepseek_chunk(
@@ -132,9 +166,10 @@ def stream_with_error(_id: str, model: str) -> Iterable[str]:
         role="assistant",
         finish_reason=None,
         usage=None,
+        created=created,
     )
-    yield f"data: {json.dumps(first_chunk, ensure_ascii=False)}\n\n"
-    time.sleep(0.05)
+    yield sse_event(first_chunk)
+    await asyncio.sleep(0.05)
 
     # A couple of middle chunks
     for t in tokens[1:3]:
@@ -145,9 +180,10 @@ def stream_with_error(_id: str, model: str) -> Iterable[str]:
             role="assistant",
             finish_reason=None,
             usage=None,
+            created=created,
         )
-        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
-        time.sleep(0.05)
+        yield sse_event(chunk)
+        await asyncio.sleep(0.05)
 
     # Simulate a hard upstream failure (connection drop)
     # In a real server this might be network-level; here we emulate by raising.
@@ -165,13 +201,14 @@ async def deepseek_chat_completions(request: Request):
       "model": "deepseek-chat",
       "messages": [...],
       "stream": true,
-      "test_mode": "normal" | "rate_limit" | "stream_error"
+      "test_mode": "normal" | "rate_limit" | "stream_error",
+      "batch_size": 1            # optional, SSE events per write in normal mode
     }
     """
     try:
-        payload = await request.json()
+        payload = orjson.loads(await request.body())
     except Exception:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=400,
             content={"error": {"message": "Invalid JSON request"}},
         )
@@ -179,13 +216,14 @@ async def deepseek_chat_completions(request: Request):
     model = payload.get("model", "deepseek-chat")
     stream = payload.get("stream", False)
     test_mode = payload.get("test_mode", "normal")
+    batch_size = payload.get("batch_size", 1)
 
     # For simplicity, we just derive an id from current time
     _id = f"mock-{int(time.time() * 1000)}"
 
     # Mode: rate_limit → return 429 JSON error (no SSE stream)
     if test_mode == "rate_limit":
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=429,
             content={
                 "error": {
@@ -198,7 +236,7 @@ async def deepseek_chat_completions(request: Request):
 
     # Only stream mode is supported in this mock
     if not stream:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=400,
             content={
                 "error": {
@@ -208,12 +246,23 @@ async def deepseek_chat_completions(request: Request):
             },
         )
 
+    if not isinstance(batch_size, int) or isinstance(batch_size, bool) or batch_size < 1:
+        return ORJSONResponse(
+            status_code=400,
+            content={
+                "error": {
+                    "message": "batch_size must be a positive integer",
+                    "type": "invalid_request_error",
+                }
+            },
+        )
+
     # Choose which generator to use based on test_mode
     if test_mode == "stream_error":
         generator = stream_with_error(_id=_id, model=model)
     else:
         # default or "normal"
-        generator = normal_stream(_id=_id, model=model)
+        generator = normal_stream(_id=_id, model=model, batch_size=batch_size)
 
     return StreamingResponse(
         generator,
@@ -4,86 +4,164 @@ Generate ground truth answers for sample datasets.
 This script calculates the correct statistics for each sample log file.
 """
 
+import csv
+import io
 import json
+import multiprocessing
 import os
 from pathlib import Path
-from collections import Counter
+
+try:
+    import pandas as pd
+except ImportError:  # optional; only used for large logs
+    pd = None
+
+# Logs at least this large go through pandas' C tokenizer when it is installed
+VECTORIZE_MIN_BYTES = 8 * 1024 * 1024
+
+LOG_FIELDS = [
+    'timestamp', 'stream_id', 'method', 'path', 'status',
+    'bytes_sent', 'bytes_recv', 'rtt_ms', 'congestion', 'quic_version',
+]
+INT_FIELDS = ['stream_id', 'status', 'bytes_sent', 'bytes_recv', 'rtt_ms']
+METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'HEAD', 'OPTIONS']
+CONGESTIONS = ['bbr', 'cubic']
+
+# Hashed lookups for the bytes-mode line loop
+METHOD_BYTES = frozenset(m.encode() for m in METHODS)
+CONGESTION_BYTES = frozenset(c.encode() for c in CONGESTIONS)
+
 
 def parse_log_file(filepath):
     """Parse a log file and calculate statistics."""
+    if pd is not None and os.path.getsize(filepath) >= VECTORIZE_MIN_BYTES:
+        parsed = parse_log_file_vectorized(filepath)
+        if parsed is not None:
+            return parsed
+
+    with open(filepath, 'rb', buffering=1 << 20) as f:
+        # Work in bytes: the logs are ASCII, so skip the per-line decode
+        counts = check_lines(enumerate(f, 1))
+
+    return finish_stats(counts), counts['bad_lines']
+
+
+def check_lines(numbered_lines):
+    """
+    Validate (line number, raw line) pairs and tally the valid ones.
+
+    Returns a dict with total_requests, error_count, rtt_sum, bbr_count,
+    cubic_count, the first valid line's congestion and number, and the
+    (line number, reason) of every bad line.
+    """
     total_requests = 0
     error_count = 0
     rtt_sum = 0
-    congestion_counter = Counter()
+    bbr_count = 0
+    cubic_count = 0
+    first_congestion = None
+    first_congestion_line = None
     bad_lines = []
 
-    with open(filepath, 'r') as f:
-        for line_num, line in enumerate(f, 1):
-            line = line.strip()
+    for line_num, line in numbered_lines:
+        line = line.strip()
 
-            # Skip empty lines and comments
-            if not line or line.startswith('#'):
-                continue
+        # Skip empty lines and comments
+        if not line or line[:1] == b'#':
+            continue
 
-            fields = line.split(',')
+        # Check field count (v1.0 has 10 fields, v1.1 has 11) before
+        # paying for the split
+        separators = line.count(b',')
+        if separators < 9:
+            bad_lines.append((line_num, f"insufficient fields: {separators + 1}"))
+            continue
 
-            # Check field count (v1.0 has 10 fields, v1.1 has 11)
-            if len(fields) < 10:
-                bad_lines.append((line_num, f"insufficient fields: {len(fields)}"))
-                continue
+        fields = line.split(b',')
 
+        # Integer fields are plain digits on well-formed lines; only when
+        # that check fails let int() decide, on the decoded text as before:
+        # it also takes signs, padding and non-ASCII digits, and its error
+        # then quotes the field as text. The common case never sets up a
+        # ValueError
+        if (fields[1].isdigit() and fields[4].isdigit() and fields[5].isdigit()
+                and fields[6].isdigit() and fields[7].isdigit()):
+            status = int(fields[4])
+            rtt_ms = int(fields[7])
+        else:
             try:
-                # Parse required fields
-                timestamp = fields[0]  # ISO8601
-                stream_id = int(fields[1])
-                method = fields[2]
-                path = fields[3]
-                status = int(fields[4])
-                bytes_sent = int(fields[5])
-                bytes_recv = int(fields[6])
-                rtt_ms = int(fields[7])
-                congestion = fields[8]
-                quic_version = fields[9]
-
-                # Validate fields
-                if not timestamp.endswith('Z'):
-                    bad_lines.append((line_num, f"invalid timestamp: {timestamp}"))
-                    continue
-
-                if method not in ('GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'HEAD', 'OPTIONS'):
-                    bad_lines.append((line_num, f"invalid method: {method}"))
-                    continue
-
-                if status < 100 or status > 599:
-                    bad_lines.append((line_num, f"invalid status: {status}"))
-                    continue
-
-                if congestion not in ('bbr', 'cubic'):
-                    bad_lines.append((line_num, f"invalid congestion: {congestion}"))
-                    continue
-
-                if not quic_version.startswith('q'):
-                    bad_lines.append((line_num, f"invalid quic_version: {quic_version}"))
-                    continue
-
-                # Valid line - count it
-                total_requests += 1
-                rtt_sum += rtt_ms
-                congestion_counter[congestion] += 1
-
-                # Count errors (4xx and 5xx)
-                if 400 <= status <= 599:
-                    error_count += 1
-
-            except (ValueError, IndexError) as e:
+                _, status, _, _, rtt_ms = [
+                    int(fields[i].decode(errors='replace')) for i in (1, 4, 5, 6, 7)
+                ]
+            except ValueError as e:
                 bad_lines.append((line_num, str(e)))
                 continue
 
-    # Calculate statistics
+        # Parse required fields
+        timestamp = fields[0]  # ISO8601
+        method = fields[2]
+        congestion = fields[8]
+        quic_version = fields[9]
+
+        # Validate fields, cheapest checks first
+        if status < 100 or status > 599:
+            bad_lines.append((line_num, f"invalid status: {status}"))
+            continue
+
+        if method not in METHOD_BYTES:
+            bad_lines.append((line_num, f"invalid method: {method.decode(errors='replace')}"))
+            continue
+
+        if congestion not in CONGESTION_BYTES:
+            bad_lines.append((line_num, f"invalid congestion: {congestion.decode(errors='replace')}"))
+            continue
+
+        if quic_version[:1] != b'q':
+            bad_lines.append((line_num, f"invalid quic_version: {quic_version.decode(errors='replace')}"))
+            continue
+
+        if not timestamp.endswith(b'Z'):
+            bad_lines.append((line_num, f"invalid timestamp: {timestamp.decode(errors='replace')}"))
+            continue
+
+        # Valid line - count it
+        total_requests += 1
+        rtt_sum += rtt_ms
+        if congestion == b'bbr':
+            bbr_count += 1
+        else:
+            cubic_count += 1
+        if first_congestion is None:
+            first_congestion = congestion.decode()
+            first_congestion_line = line_num
+
+        # Count errors (4xx and 5xx)
+        if 400 <= status <= 599:
+            error_count += 1
+
+    return {
+        "total_requests": total_requests,
+        "error_count": error_count,
+        "rtt_sum": rtt_sum,
+        "bbr_count": bbr_count,
+        "cubic_count": cubic_count,
+        "first_congestion": first_congestion,
+        "first_congestion_line": first_congestion_line,
+        "bad_lines": bad_lines,
+    }
+
+
+def finish_stats(counts):
+    """Turn check_lines() tallies into the reported statistics."""
+    total_requests = counts['total_requests']
     if total_requests > 0:
-        error_rate = round(error_count / total_requests, 2)
-        avg_rtt_ms = round(rtt_sum / total_requests, 1)
-        top_congestion = congestion_counter.most_common(1)[0][0]
+        error_rate = round(counts['error_count'] / total_requests, 2)
+        avg_rtt_ms = round(counts['rtt_sum'] / total_requests, 1)
+        # Ties go to whichever algorithm appeared first
+        if counts['bbr_count'] != counts['cubic_count']:
+            top_congestion = 'bbr' if counts['bbr_count'] > counts['cubic_count'] else 'cubic'
+        else:
+            top_congestion = counts['first_congestion']
     else:
         error_rate = 0.0
         avg_rtt_ms = 0.0
@@ -94,7 +172,98 @@ def parse_log_file(filepath):
         "error_rate": error_rate,
         "avg_rtt_ms": avg_rtt_ms,
         "top_congestion": top_congestion
-    }, bad_lines
+    }
+
+
+def parse_log_file_vectorized(filepath):
+    """
+    Same result as parse_log_file, with the plain lines tallied by pandas.
+
+    Column operations only settle rows that are certainly comments or
+    certainly valid with plain-digit integers; every other row (blank,
+    padded, signed, underscored, short, invalid...) goes through
+    check_lines, so bad-line reasons and int() rules are the loop's own.
+    Returns None when pandas' rows might not line up with the file's lines
+    (lone CRs, NUL bytes, no 10-field row at all); the caller then runs
+    the loop over the whole file.
+    """
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+
+    line_count = raw.count(b'\n') + (1 if raw and not raw.endswith(b'\n') else 0)
+    if b'\x00' in raw or raw.count(b'\r') != raw.count(b'\r\n'):
+        return None
+
+    # Every line becomes a row (blank ones included, so row i is line i+1).
+    # Fields past the 10th (v1.1 cache status, future additions) are ignored.
+    try:
+        df = pd.read_csv(
+            io.BytesIO(raw),
+            header=None,
+            names=LOG_FIELDS,
+            usecols=range(len(LOG_FIELDS)),
+            dtype=str,
+            keep_default_na=False,
+            skip_blank_lines=False,
+            quoting=csv.QUOTE_NONE,
+            engine='c',
+            encoding_errors='surrogateescape',
+        )
+    except (ValueError, pd.errors.ParserError):
+        return None
+    if len(df) != line_count:
+        return None
+
+    # Up to 9 plain digits: int() agrees, and int64 sums cannot overflow
+    ints_ok = pd.Series(True, index=df.index)
+    for col in INT_FIELDS:
+        ints_ok &= df[col].str.fullmatch(r'[0-9]{1,9}')
+    status = pd.to_numeric(df.status.where(ints_ok, '0'))
+    rtt_ms = pd.to_numeric(df.rtt_ms.where(ints_ok, '0'))
+
+    # A leading space/tab/CR (stripped by the loop) or a BOM (dropped by
+    # pandas on the first row) means the row needs the loop's eye
+    first_char = df.timestamp.str[:1]
+    plain_start = ~first_char.isin(['', ' ', '\t', '\n', '\v', '\f', '\r'])
+    plain_start.iloc[:1] = False
+
+    comment = plain_start & (first_char == '#')
+    valid = (
+        plain_start & ~comment & ints_ok
+        & (status >= 100) & (status <= 599)
+        & df.method.isin(METHODS)
+        & df.congestion.isin(CONGESTIONS)
+        & df.quic_version.str.startswith('q')
+        & df.timestamp.str.endswith('Z')
+    )
+
+    # Everything else is checked line by line, exactly as parse_log_file does
+    unsettled = (~(comment | valid)).to_numpy().nonzero()[0]
+    if len(unsettled):
+        lines = raw.split(b'\n')
+        counts = check_lines((int(i) + 1, lines[i]) for i in unsettled)
+    else:
+        counts = check_lines(())
+
+    congestion = df.congestion[valid]
+    counts['total_requests'] += int(valid.sum())
+    counts['error_count'] += int((status[valid] >= 400).sum())
+    counts['rtt_sum'] += int(rtt_ms[valid].sum())
+    counts['bbr_count'] += int((congestion == 'bbr').sum())
+    counts['cubic_count'] += int((congestion == 'cubic').sum())
+    if len(congestion):
+        first = int(congestion.index[0]) + 1
+        if counts['first_congestion_line'] is None or first < counts['first_congestion_line']:
+            counts['first_congestion'] = congestion.iloc[0]
+            counts['first_congestion_line'] = first
+
+    return finish_stats(counts), counts['bad_lines']
+
+
+def _parse_worker(log_file):
+    """Pool worker: parse one log and tag the result with its file name."""
+    stats, bad_lines = parse_log_file(log_file)
+    return log_file.name, stats, bad_lines
 
 
 def main():
@@ -102,13 +271,21 @@ def main():
 
     results = {}
 
-    for log_file in sorted(sample_dir.glob("*.log")):
+    # Files are independent, so parse them in parallel; reporting stays in order
+    log_files = sorted(sample_dir.glob("*.log"))
+    workers = min(len(log_files), os.cpu_count() or 1)
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            parsed = pool.map(_parse_worker, log_files)
+    else:
+        parsed = [_parse_worker(log_file) for log_file in log_files]
+
+    for name, stats, bad_lines in parsed:
         print(f"\n{'='*60}")
-        print(f"Processing: {log_file.name}")
+        print(f"Processing: {name}")
         print('='*60)
 
-        stats, bad_lines = parse_log_file(log_file)
-        results[log_file.name] = stats
+        results[name] = stats
 
         print(f"Results:")
         print(json.dumps(stats, indent=2))
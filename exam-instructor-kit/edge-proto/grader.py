@@ -19,13 +19,22 @@ import argparse
 import json
 import os
 import resource
+import shutil
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional, Any
 from datetime import datetime
 from dataclasses import dataclass, asdict
 
+try:
+    import orjson
+except ImportError:  # optional speed-up; json.loads accepts bytes too
+    orjson = None
+
+json_loads = orjson.loads if orjson is not None else json.loads
+
 
 # =============================================================================
 # Sandbox - Resource Limits for Student Code
@@ -37,18 +46,55 @@ SANDBOX_MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB
 SANDBOX_MAX_PROCESSES = 10
 
 
-def set_resource_limits():
+# (prlimit flag, resource, value), applied in this order
+SANDBOX_RLIMITS = (
+    ('cpu', resource.RLIMIT_CPU, SANDBOX_MAX_CPU_TIME),
+    ('as', resource.RLIMIT_AS, SANDBOX_MAX_MEMORY),
+    ('fsize', resource.RLIMIT_FSIZE, SANDBOX_MAX_FILE_SIZE),
+    ('nproc', resource.RLIMIT_NPROC, SANDBOX_MAX_PROCESSES),
+    ('core', resource.RLIMIT_CORE, 0),  # No core dumps
+)
+
+# Pre-built setrlimit arguments, so the forked child only loops and calls
+_SETRLIMIT_ARGS = tuple((limit, (value, value)) for _, limit, value in SANDBOX_RLIMITS)
+
+
+def set_resource_limits(_setrlimit=resource.setrlimit, _args=_SETRLIMIT_ARGS):
     """Set resource limits for student code execution."""
     try:
-        resource.setrlimit(resource.RLIMIT_CPU, (SANDBOX_MAX_CPU_TIME, SANDBOX_MAX_CPU_TIME))
-        resource.setrlimit(resource.RLIMIT_AS, (SANDBOX_MAX_MEMORY, SANDBOX_MAX_MEMORY))
-        resource.setrlimit(resource.RLIMIT_FSIZE, (SANDBOX_MAX_FILE_SIZE, SANDBOX_MAX_FILE_SIZE))
-        resource.setrlimit(resource.RLIMIT_NPROC, (SANDBOX_MAX_PROCESSES, SANDBOX_MAX_PROCESSES))
-        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))  # No core dumps
+        for limit, values in _args:
+            _setrlimit(limit, values)
     except Exception:
         pass  # Best effort
 
 
+def build_prlimit_prefix() -> Optional[List[str]]:
+    """
+    Build a `prlimit ... --` command prefix applying the sandbox limits.
+
+    Wrapping the command instead of using preexec_fn lets subprocess take
+    the posix_spawn/vfork path rather than fork-and-run-Python in the child.
+    Limits are capped at the current hard limits so prlimit never fails on
+    a limit it isn't allowed to raise. Returns None if prlimit is missing.
+    """
+    prlimit = shutil.which('prlimit')
+    if prlimit is None:
+        return None
+
+    prefix = [prlimit]
+    for flag, limit, value in SANDBOX_RLIMITS:
+        hard = resource.getrlimit(limit)[1]
+        if hard != resource.RLIM_INFINITY:
+            value = min(value, hard)
+        prefix.append(f'--{flag}={value}')
+    prefix.append('--')
+    return prefix
+
+
+# None -> fall back to set_resource_limits via preexec_fn (datasets then run serially)
+PRLIMIT_PREFIX = build_prlimit_prefix()
+
+
 def get_safe_environment() -> dict:
     """Get sanitized environment for running student code."""
     return {
@@ -156,22 +202,31 @@ def run_program(
     input_file: Path,
     working_dir: Path,
     timeout: int = 30
-) -> Tuple[Optional[Dict], str, str]:
-    """Run student program and capture output with sandboxing."""
+) -> Tuple[Optional[Dict], bytes, str]:
+    """Run student program and capture output with sandboxing.
+
+    stdout is kept as raw bytes and parsed without a text decode; only
+    stderr is decoded, for error messages.
+    """
+
+    argv = command + [str(input_file)]
+    if PRLIMIT_PREFIX is not None:
+        argv, preexec = PRLIMIT_PREFIX + argv, None
+    else:
+        preexec = set_resource_limits
 
     try:
         result = subprocess.run(
-            command + [str(input_file)],
+            argv,
             cwd=working_dir,
             capture_output=True,
-            text=True,
             timeout=timeout,
             env=get_safe_environment(),
-            preexec_fn=set_resource_limits  # Apply resource limits
+            preexec_fn=preexec  # Apply resource limits
         )
 
-        stdout = result.stdout.strip()
-        stderr = result.stderr.strip()
+        stdout = result.stdout
+        stderr = result.stderr.decode('utf-8', errors='replace').strip()
 
         if result.returncode != 0:
             # Check for resource limit signals
@@ -182,15 +237,44 @@ def run_program(
             return None, stdout, f"Exit code {result.returncode}: {stderr}"
 
         try:
-            parsed = json.loads(stdout)
+            parsed = json_loads(stdout)
             return parsed, stdout, stderr
-        except json.JSONDecodeError as e:
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
             return None, stdout, f"Invalid JSON output: {e}"
 
     except subprocess.TimeoutExpired:
-        return None, "", f"Timeout after {timeout}s"
+        return None, b"", f"Timeout after {timeout}s"
     except Exception as e:
-        return None, "", f"Execution error: {e}"
+        return None, b"", f"Execution error: {e}"
+
+
+def run_program_batch(
+    command: List[str],
+    input_files: List[Path],
+    working_dir: Path,
+    timeout: int = 30
+) -> Optional[Dict[str, Dict]]:
+    """
+    Try the optional batch protocol: one run over all datasets.
+
+    `<command> --batch f1 f2 ...` must print a JSON object mapping each
+    file's name to its stats. Only used for submissions that ship a
+    BATCH_MARKER file, since the challenge spec has no such flag. Returns
+    None for anything else, so the caller falls back to one run per
+    dataset.
+    """
+    parsed, _, _ = run_program(
+        command + ['--batch'] + [str(f) for f in input_files[:-1]],
+        input_files[-1],
+        working_dir,
+        timeout=timeout * len(input_files),
+    )
+
+    if not isinstance(parsed, dict):
+        return None
+    if not all(isinstance(parsed.get(f.name), dict) for f in input_files):
+        return None
+    return parsed
 
 
 # =============================================================================
@@ -205,6 +289,10 @@ DATASETS = [
     ('edge_proto_v1_1_D.log', 'v1.1', 'robustness', 14),
 ]
 
+# A submission containing this file is offered the --batch protocol
+# (see run_program_batch)
+BATCH_MARKER = '.batch_supported'
+
 TOLERANCE = {
     'error_rate': 0.01,
     'avg_rtt_ms': 0.5,
@@ -297,14 +385,39 @@ def grade_submission(
 
     language, command = exe_info
 
+    # One directory listing instead of a stat per dataset
+    try:
+        available = {entry.name for entry in os.scandir(hidden_data_dir)}
+    except OSError:
+        available = set()
+    input_files = [hidden_data_dir / filename for filename, _, _, _ in DATASETS if filename in available]
+
+    # One interpreter start for all datasets when the program says it
+    # supports that
+    batch_results = None
+    if len(input_files) > 1 and (submission_dir / BATCH_MARKER).is_file():
+        batch_results = run_program_batch(command, input_files, submission_dir)
+
+    # Otherwise run the datasets concurrently; each run is an independent
+    # child process with its own resource limits. Without prlimit the limits
+    # are set by a preexec_fn, which is not safe to fork from several
+    # threads at once, so the runs go one after another instead
+    if batch_results is not None:
+        outputs = {f.name: (batch_results[f.name], "") for f in input_files}
+    elif len(input_files) > 1 and PRLIMIT_PREFIX is not None:
+        with ThreadPoolExecutor(max_workers=len(input_files)) as pool:
+            runs = pool.map(lambda f: run_program(command, f, submission_dir), input_files)
+            outputs = {f.name: (result, stderr) for f, (result, _, stderr) in zip(input_files, runs)}
+    else:
+        runs = (run_program(command, f, submission_dir) for f in input_files)
+        outputs = {f.name: (result, stderr) for f, (result, _, stderr) in zip(input_files, runs)}
+
     # Grade each dataset
     dataset_results = []
     total_score = 0
 
     for filename, version, category, max_points in DATASETS:
-        input_file = hidden_data_dir / filename
-
-        if not input_file.exists():
+        if filename not in outputs:
             dataset_results.append(DatasetResult(
                 name=filename,
                 version=version,
@@ -320,8 +433,7 @@ def grade_submission(
 
         expected = expected_results.get(filename, {})
 
-        # Run program
-        result, stdout, stderr = run_program(command, input_file, submission_dir)
+        result, stderr = outputs[filename]
 
         if result is None:
             dataset_results.append(DatasetResult(
@@ -383,61 +495,91 @@ def print_result(result: GradingResult):
     """Print formatted grading result to console."""
 
     c = Colors
+    # Build the whole report and emit it with a single write
+    out = []
 
-    print(f"\n{c.BOLD}{'='*60}{c.RESET}")
-    print(f"{c.BOLD}GRADING RESULT{c.RESET}")
-    print(f"{'='*60}")
-    print(f"Student: {result.student_id}")
-    print(f"Time:    {result.timestamp}")
-    print()
+    out.append(f"\n{c.BOLD}{'='*60}{c.RESET}")
+    out.append(f"{c.BOLD}GRADING RESULT{c.RESET}")
+    out.append(f"{'='*60}")
+    out.append(f"Student: {result.student_id}")
+    out.append(f"Time:    {result.timestamp}")
+    out.append("")
 
     # Per-dataset results
     for ds in result.datasets:
         pct_bar = "█" * int(ds.percentage / 10) + "░" * (10 - int(ds.percentage / 10))
         status_color = c.GREEN if ds.percentage == 100 else (c.YELLOW if ds.percentage >= 50 else c.RED)
 
-        print(f"{c.BOLD}{ds.name}{c.RESET} ({ds.version}, {ds.category})")
+        out.append(f"{c.BOLD}{ds.name}{c.RESET} ({ds.version}, {ds.category})")
 
         if not ds.success:
-            print(f"  {c.RED}✗ FAILED: {ds.error_message}{c.RESET}")
-            print(f"  Points: 0 / {ds.points_possible:.0f}")
+            out.append(f"  {c.RED}✗ FAILED: {ds.error_message}{c.RESET}")
+            out.append(f"  Points: 0 / {ds.points_possible:.0f}")
         else:
-            print(f"  [{pct_bar}] {status_color}{ds.percentage:.0f}%{c.RESET}")
+            out.append(f"  [{pct_bar}] {status_color}{ds.percentage:.0f}%{c.RESET}")
             for f in ds.fields:
                 icon = f"{c.GREEN}✓{c.RESET}" if f.is_correct else f"{c.RED}✗{c.RESET}"
-                print(f"  {icon} {f.field_name}: expected={f.expected}, actual={f.actual}")
-            print(f"  Points: {ds.points_earned:.1f} / {ds.points_possible:.0f}")
-        print()
+                out.append(f"  {icon} {f.field_name}: expected={f.expected}, actual={f.actual}")
+            out.append(f"  Points: {ds.points_earned:.1f} / {ds.points_possible:.0f}")
+        out.append("")
 
     # Final score
-    print(f"{'='*60}")
+    out.append(f"{'='*60}")
     status_color = c.GREEN if result.passed else c.RED
     status_text = "PASSED" if result.passed else "FAILED"
 
-    print(f"{c.BOLD}FINAL SCORE: {result.total_score:.1f} / {result.max_score:.0f}{c.RESET}")
-    print(f"{c.BOLD}GRADE: {result.grade}{c.RESET}")
-    print(f"{c.BOLD}STATUS: {status_color}{status_text}{c.RESET}")
-    print(f"{'='*60}\n")
+    out.append(f"{c.BOLD}FINAL SCORE: {result.total_score:.1f} / {result.max_score:.0f}{c.RESET}")
+    out.append(f"{c.BOLD}GRADE: {result.grade}{c.RESET}")
+    out.append(f"{c.BOLD}STATUS: {status_color}{status_text}{c.RESET}")
+    out.append(f"{'='*60}\n")
+
+    sys.stdout.write("\n".join(out) + "\n")
+    sys.stdout.flush()
 
 
 def save_json_result(result: GradingResult, output_file: Path):
     """Save result as JSON file."""
 
-    def to_dict(obj):
-        if hasattr(obj, '__dataclass_fields__'):
-            return {k: to_dict(v) for k, v in asdict(obj).items()}
-        elif isinstance(obj, list):
-            return [to_dict(i) for i in obj]
-        return obj
+    # orjson serializes the dataclass tree natively, without an asdict() copy
+    if orjson is not None:
+        try:
+            data = orjson.dumps(result, option=orjson.OPT_INDENT_2)
+        except TypeError:  # e.g. an out-of-range int echoed from student output
+            data = None
+        if data is not None:
+            with open(output_file, 'wb') as f:
+                f.write(data)
+            return
 
     with open(output_file, 'w') as f:
-        json.dump(to_dict(result), f, indent=2)
+        json.dump(asdict(result), f, indent=2)
 
 
 # =============================================================================
 # Main
 # =============================================================================
 
+def run(
+    submission_dir: Path,
+    hidden_data_dir: Path,
+    expected_file: Path,
+    output_file: Optional[Path] = None,
+) -> GradingResult:
+    """
+    Grade one submission and optionally save the JSON result, without
+    printing anything. The grading server calls this in its worker pool.
+    """
+    with open(expected_file) as f:
+        expected_results = json.load(f)
+
+    result = grade_submission(Path(submission_dir), Path(hidden_data_dir), expected_results)
+
+    if output_file:
+        save_json_result(result, Path(output_file))
+
+    return result
+
+
 def main():
     parser = argparse.ArgumentParser(description='Edge-Proto Challenge Grader')
     parser.add_argument('--submission', required=True, help='Path to student submission directory')
@@ -464,20 +606,14 @@ def main():
         print(f"Error: Expected results file not found: {expected_file}")
         sys.exit(1)
 
-    # Load expected results
-    with open(expected_file) as f:
-        expected_results = json.load(f)
-
     # Grade
-    result = grade_submission(submission_dir, hidden_data_dir, expected_results)
+    result = run(submission_dir, hidden_data_dir, expected_file, args.output)
 
     # Output
     print_result(result)
 
     if args.output:
-        output_file = Path(args.output)
-        save_json_result(result, output_file)
-        print(f"JSON result saved to: {output_file}")
+        print(f"JSON result saved to: {args.output}")
 
     # Exit code: 0 if passed, 1 if failed
     sys.exit(0 if result.passed else 1)
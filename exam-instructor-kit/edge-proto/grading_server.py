@@ -19,17 +19,24 @@ Usage:
     python grading_server.py --port 8123
 
 API Endpoints:
-    POST /submit              - Submit ZIP file for grading (requires X-API-Key header)
+    POST /submit              - Queue ZIP file for grading, returns a job id (requires X-API-Key header)
+    POST /submit?wait=1       - Grade synchronously and return the result (requires X-API-Key header)
+    GET  /result/<job_id>     - Job status, or its result once graded (requires X-API-Key header)
     GET  /health              - Health check (public)
     GET  /status              - Server stats (public)
     GET  /results             - View all results (requires X-API-Key header)
     GET  /results/<student>   - View student results (requires X-API-Key header)
+                                ?summary=1 omits the full result_json
 """
 
 import argparse
+import functools
 import hashlib
+import hmac
 import json
+import multiprocessing
 import os
+import queue
 import secrets
 import shutil
 import sqlite3
@@ -37,14 +44,34 @@ import subprocess
 import tempfile
 import time
 import zipfile
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from pathlib import Path
 from typing import Dict, Optional
 from urllib.parse import parse_qs, urlparse
 import threading
 
+try:
+    import orjson
+except ImportError:  # optional speed-up; falls back to compact json.dumps
+    orjson = None
+
+try:
+    import grader
+except ImportError:  # grader.py not importable; every submission uses a subprocess
+    grader = None
+
+
+def json_dumps(data) -> bytes:
+    """Serialize to compact UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
 # =============================================================================
 # Configuration
 # =============================================================================
@@ -53,6 +80,36 @@ MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # 10 MB
 RATE_LIMIT_WINDOW = 60  # seconds
 RATE_LIMIT_MAX = 10  # max submissions per window per IP
 GRADING_TIMEOUT = 60  # seconds
+GRADER_WORKERS = min(4, os.cpu_count() or 1)  # warm grader processes
+JOB_RETENTION = 3600  # seconds a finished job's result stays collectable
+UPLOAD_CHUNK_SIZE = 64 * 1024  # bytes read from the request body at a time
+RESPONSE_CHUNK_SIZE = 64 * 1024  # streamed responses are written in pieces of about this size
+
+# Keep uploaded ZIPs and extracted submissions on tmpfs when available, so
+# the grader reads them from memory instead of the disk behind /tmp
+EXTRACT_TO_MEMORY = True
+SHM_DIR = Path('/dev/shm') if os.path.isdir('/dev/shm') else None
+WORK_DIR = str(SHM_DIR) if EXTRACT_TO_MEMORY and SHM_DIR is not None else None  # None: system default
+DB_POOL_SIZE = max(4, RATE_LIMIT_MAX)  # idle SQLite connections kept open
+
+# Applied to every new SQLite connection. WAL lets readers run alongside the
+# writer and, with synchronous=NORMAL, drops the fsync from each commit.
+DB_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "mmap_size=268435456",  # 256 MB
+    "cache_size=-20000",  # ~20 MB
+    "busy_timeout=5000",  # ms
+    "wal_autocheckpoint=1000",  # pages
+)
+
+# Background writer: commit up to this many queued rows per transaction,
+# waiting at most this long for a batch to fill
+DB_WRITE_BATCH_SIZE = 500
+DB_WRITE_BATCH_WAIT = 0.01  # seconds
+
+STATS_CACHE_TTL = 2.0  # seconds; /status pollers within this window share one query
 
 # Paths (relative to script directory)
 SCRIPT_DIR = Path(__file__).parent.resolve()
@@ -78,76 +135,323 @@ def load_api_key() -> Optional[str]:
     return None
 
 
+# SHA-256 of the stored key, loaded on first use so the auth check never
+# touches the disk; save_api_key() replaces it
+_api_key_digest: Optional[bytes] = None
+
+
+def _digest_key(key: str) -> bytes:
+    return hashlib.sha256(key.encode('utf-8')).digest()
+
+
 def save_api_key(key: str):
     """Save API key to file."""
+    global _api_key_digest
     API_KEY_FILE.write_text(key)
     os.chmod(API_KEY_FILE, 0o600)  # Only owner can read
+    _api_key_digest = _digest_key(key)
 
 
 def verify_api_key(provided_key: str) -> bool:
-    """Verify provided API key."""
-    stored_key = load_api_key()
-    if stored_key is None:
-        return False
-    return secrets.compare_digest(provided_key, stored_key)
+    """Verify provided API key.
+
+    Digests are compared rather than the keys themselves, so
+    hmac.compare_digest always sees equal-length inputs.
+    """
+    global _api_key_digest
+    if _api_key_digest is None:
+        stored_key = load_api_key()
+        if stored_key is None:
+            return False
+        _api_key_digest = _digest_key(stored_key)
+    return hmac.compare_digest(_digest_key(provided_key), _api_key_digest)
 
 
 # =============================================================================
 # Database
 # =============================================================================
 
-def init_database():
-    """Initialize SQLite database."""
-    conn = sqlite3.connect(str(DATABASE_FILE))
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS submissions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_id TEXT NOT NULL,
-            timestamp TEXT NOT NULL,
-            ip_address TEXT,
-            total_score REAL,
-            grade TEXT,
-            passed INTEGER,
-            dataset_a REAL,
-            dataset_b REAL,
-            dataset_c REAL,
-            dataset_d REAL,
-            result_json TEXT,
-            error_message TEXT
+# SQL is kept in constants: sqlite3 caches prepared statements per
+# connection keyed by the SQL text, so with pooled connections each of
+# these is parsed and planned once per connection rather than per request.
+DB_STATEMENT_CACHE_SIZE = 64
+
+INSERT_SUBMISSION_SQL = '''
+    INSERT INTO submissions
+    (student_id, timestamp, ip_address, total_score, grade, passed,
+     dataset_a, dataset_b, dataset_c, dataset_d, result_json, error_message)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+SELECT_ALL_RESULTS_SQL = '''
+    SELECT id, student_id, timestamp, ip_address, total_score, grade, passed,
+           dataset_a, dataset_b, dataset_c, dataset_d, error_message
+    FROM submissions
+    ORDER BY timestamp DESC
+'''
+
+SELECT_STUDENT_RESULTS_SQL = '''
+    SELECT id, student_id, timestamp, ip_address, total_score, grade, passed,
+           dataset_a, dataset_b, dataset_c, dataset_d, result_json, error_message
+    FROM submissions
+    WHERE student_id = ?
+    ORDER BY timestamp DESC
+'''
+
+# Same rows without result_json, whose large values live on overflow pages
+SELECT_STUDENT_SUMMARY_SQL = '''
+    SELECT id, student_id, timestamp, ip_address, total_score, grade, passed,
+           dataset_a, dataset_b, dataset_c, dataset_d, error_message
+    FROM submissions
+    WHERE student_id = ?
+    ORDER BY timestamp DESC
+'''
+
+RESULT_CACHE_LOOKUP_SQL = 'SELECT result_json FROM result_cache WHERE hash = ?'
+
+RESULT_CACHE_INSERT_SQL = '''
+    INSERT OR IGNORE INTO result_cache (hash, result_json, created)
+    VALUES (?, ?, ?)
+'''
+
+# All /status numbers in one pass over the table
+STATS_SQL = '''
+    SELECT COUNT(*),
+           COALESCE(SUM(passed = 1), 0),
+           COUNT(DISTINCT student_id),
+           AVG(CASE WHEN total_score > 0 THEN total_score END)
+    FROM submissions
+'''
+
+
+class ConnectionPool:
+    """
+    Long-lived SQLite connections shared by the handler threads.
+
+    Connections are opened on demand and returned to an idle queue after
+    use, so the page cache and compiled schema survive across requests.
+    At most `size` idle connections are kept; extras are closed on release.
+    """
+
+    def __init__(self, path: Path, size: int):
+        self.path = path
+        self.size = size
+        self.idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            str(self.path),
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE_SIZE,
         )
-    ''')
+        conn.row_factory = sqlite3.Row
+        for pragma in DB_PRAGMAS:
+            conn.execute(f"PRAGMA {pragma}")
+        return conn
+
+    @contextmanager
+    def acquire(self):
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            conn = self.connect()
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            if self.idle.qsize() < self.size:
+                self.idle.put(conn)
+            else:
+                conn.close()
+
+
+db_pool = ConnectionPool(DATABASE_FILE, DB_POOL_SIZE)
+
+
+def init_database():
+    """Initialize SQLite database.
+
+    The database runs in WAL mode (see DB_PRAGMAS): copying the .db file
+    alone can miss recent commits, so back it up with `VACUUM INTO`.
+    """
+    with db_pool.acquire() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS submissions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                student_id TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                ip_address TEXT,
+                total_score REAL,
+                grade TEXT,
+                passed INTEGER,
+                dataset_a REAL,
+                dataset_b REAL,
+                dataset_c REAL,
+                dataset_d REAL,
+                result_json TEXT,
+                error_message TEXT
+            )
+        ''')
+
+        # Successful grading results keyed by submission_hasher() digest
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS result_cache (
+                hash BLOB PRIMARY KEY,
+                result_json TEXT NOT NULL,
+                created TEXT NOT NULL
+            )
+        ''')
+
+        # Serves the per-student queries in timestamp order without a sort;
+        # it also covers every lookup the old idx_student_id did
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_student_ts ON submissions(student_id, timestamp DESC)
+        ''')
+
+        conn.execute('DROP INDEX IF EXISTS idx_student_id')
+
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_timestamp ON submissions(timestamp)
+        ''')
 
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_student_id ON submissions(student_id)
-    ''')
+        conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_passed_score ON submissions(passed, total_score)
+        ''')
 
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_timestamp ON submissions(timestamp)
-    ''')
+        conn.commit()
 
-    conn.commit()
-    conn.close()
 
+class CachedValue:
+    """
+    One memoized query result.
 
-def save_submission(student_id: str, ip_address: str, result: dict):
-    """Save submission result to database."""
-    conn = sqlite3.connect(str(DATABASE_FILE))
-    cursor = conn.cursor()
+    The value is recomputed once it is older than `ttl` seconds, when the
+    caller passes a different `key`, or after invalidate(). A result
+    computed while an invalidation happened is returned but not stored.
+    """
 
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.entry: Optional[tuple] = None  # (key, expires_at, value)
+
+    def get(self, compute, key=None):
+        now = time.monotonic()
+        with self.lock:
+            entry, generation = self.entry, self.generation
+        if entry is not None and entry[0] == key and now < entry[1]:
+            return entry[2]
+
+        value = compute()
+        expires_at = now + self.ttl if self.ttl is not None else float('inf')
+        with self.lock:
+            if self.generation == generation:
+                self.entry = (key, expires_at, value)
+        return value
+
+    def invalidate(self):
+        with self.lock:
+            self.generation += 1
+            self.entry = None
+
+
+stats_cache = CachedValue(ttl=STATS_CACHE_TTL)
+
+
+class BatchWriter:
+    """
+    Single background thread that commits queued writes.
+
+    Each write is an (sql, params) pair. Writes are drained in batches,
+    grouped by statement and sent with one executemany per statement
+    inside one transaction, so a burst of submissions shares a single
+    commit and each statement is bound once per batch.
+    """
+
+    def __init__(self, pool: ConnectionPool, batch_size: int, batch_wait: float):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="db-writer", daemon=True)
+                self.thread.start()
+
+    def submit(self, sql: str, params: tuple, done: Optional[threading.Event] = None):
+        """Queue one write; `done` is set once it has been committed."""
+        self.start()
+        self.queue.put((sql, params, done))
+
+    def close(self):
+        """Flush everything queued so far and stop the thread."""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self.flush(batch)
+
+    def flush(self, batch: list):
+        rows_by_sql: Dict[str, list] = {}
+        for sql, params, _ in batch:
+            rows_by_sql.setdefault(sql, []).append(params)
+        try:
+            with self.pool.acquire() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for sql, rows in rows_by_sql.items():
+                    conn.executemany(sql, rows)
+                conn.commit()
+            if INSERT_SUBMISSION_SQL in rows_by_sql:
+                stats_cache.invalidate()
+        except sqlite3.Error as e:
+            print(f"[db-writer] Failed to save {len(batch)} row(s): {e}")
+        finally:
+            for _, _, done in batch:
+                if done is not None:
+                    done.set()
+
+
+db_writer = BatchWriter(db_pool, DB_WRITE_BATCH_SIZE, DB_WRITE_BATCH_WAIT)
+
+
+def save_submission(student_id: str, ip_address: str, result: dict, wait: bool = False):
+    """Save submission result to database.
+
+    The row is committed by the background writer; pass wait=True to block
+    until it is durable.
+    """
     timestamp = datetime.now().isoformat()
 
     if result.get("success"):
         r = result.get("result", {})
         datasets = {ds["name"]: ds["points_earned"] for ds in r.get("datasets", [])}
 
-        cursor.execute('''
-            INSERT INTO submissions
-            (student_id, timestamp, ip_address, total_score, grade, passed,
-             dataset_a, dataset_b, dataset_c, dataset_d, result_json, error_message)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        params = (
             student_id,
             timestamp,
             ip_address,
@@ -158,83 +462,80 @@ def save_submission(student_id: str, ip_address: str, result: dict):
             datasets.get("edge_proto_v1_B.log", 0),
             datasets.get("edge_proto_v1_1_C.log", 0),
             datasets.get("edge_proto_v1_1_D.log", 0),
-            json.dumps(r),
+            json_dumps(r).decode('utf-8'),
             None
-        ))
+        )
     else:
-        cursor.execute('''
-            INSERT INTO submissions
-            (student_id, timestamp, ip_address, total_score, grade, passed,
-             dataset_a, dataset_b, dataset_c, dataset_d, result_json, error_message)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        params = (
             student_id,
             timestamp,
             ip_address,
             0, "F", 0, 0, 0, 0, 0,
             None,
             result.get("error", "Unknown error")
-        ))
+        )
 
-    conn.commit()
-    conn.close()
+    done = threading.Event() if wait else None
+    db_writer.submit(INSERT_SUBMISSION_SQL, params, done)
+    if done is not None:
+        done.wait()
 
 
-def get_all_results() -> list:
-    """Get all submission results."""
-    conn = sqlite3.connect(str(DATABASE_FILE))
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+def get_cached_result(digest: bytes) -> Optional[dict]:
+    """Return the stored grading result for a submission digest, if any."""
+    with db_pool.acquire() as conn:
+        row = conn.execute(RESULT_CACHE_LOOKUP_SQL, (digest,)).fetchone()
+    return json.loads(row[0]) if row is not None else None
 
-    cursor.execute('''
-        SELECT id, student_id, timestamp, ip_address, total_score, grade, passed,
-               dataset_a, dataset_b, dataset_c, dataset_d, error_message
-        FROM submissions
-        ORDER BY timestamp DESC
-    ''')
 
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return results
+def is_cacheable_result(result: dict) -> bool:
+    """
+    Only results where every dataset ran are worth keeping: timeouts and
+    crashes can come from server load rather than the submission.
+    """
+    datasets = result.get("datasets") or []
+    return bool(datasets) and all(ds.get("success") for ds in datasets)
 
 
-def get_student_results(student_id: str) -> list:
-    """Get results for a specific student."""
-    conn = sqlite3.connect(str(DATABASE_FILE))
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+def cache_result(digest: bytes, result_json: str):
+    """Remember a grading result (committed by the background writer)."""
+    db_writer.submit(RESULT_CACHE_INSERT_SQL, (digest, result_json, datetime.now().isoformat()))
 
-    cursor.execute('''
-        SELECT id, student_id, timestamp, ip_address, total_score, grade, passed,
-               dataset_a, dataset_b, dataset_c, dataset_d, result_json, error_message
-        FROM submissions
-        WHERE student_id = ?
-        ORDER BY timestamp DESC
-    ''', (student_id,))
 
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return results
+def iter_all_results():
+    """Yield every submission result, newest first, straight off the cursor.
 
+    A pooled connection is held until the generator is exhausted or closed.
+    """
+    with db_pool.acquire() as conn:
+        for row in conn.execute(SELECT_ALL_RESULTS_SQL):
+            yield dict(row)
 
-def get_stats() -> dict:
-    """Get submission statistics."""
-    conn = sqlite3.connect(str(DATABASE_FILE))
-    cursor = conn.cursor()
 
-    cursor.execute('SELECT COUNT(*) FROM submissions')
-    total = cursor.fetchone()[0]
+def get_student_results(student_id: str) -> list:
+    """Get results for a specific student."""
+    with db_pool.acquire() as conn:
+        cursor = conn.execute(SELECT_STUDENT_RESULTS_SQL, (student_id,))
+        return [dict(row) for row in cursor.fetchall()]
 
-    cursor.execute('SELECT COUNT(*) FROM submissions WHERE passed = 1')
-    passed = cursor.fetchone()[0]
 
-    cursor.execute('SELECT COUNT(DISTINCT student_id) FROM submissions')
-    unique_students = cursor.fetchone()[0]
+def get_student_results_summary(student_id: str) -> list:
+    """Get results for a specific student, without the full result_json."""
+    with db_pool.acquire() as conn:
+        cursor = conn.execute(SELECT_STUDENT_SUMMARY_SQL, (student_id,))
+        return [dict(row) for row in cursor.fetchall()]
 
-    cursor.execute('SELECT AVG(total_score) FROM submissions WHERE total_score > 0')
-    avg_score = cursor.fetchone()[0] or 0
 
-    conn.close()
+def get_stats() -> dict:
+    """Get submission statistics (cached for STATS_CACHE_TTL seconds)."""
+    return stats_cache.get(query_stats)
+
+
+def query_stats() -> dict:
+    """Run the stats query, bypassing the cache."""
+    with db_pool.acquire() as conn:
+        total, passed, unique_students, avg_score = conn.execute(STATS_SQL).fetchone()
+    avg_score = avg_score or 0
 
     return {
         "total_submissions": total,
@@ -250,26 +551,46 @@ def get_stats() -> dict:
 # =============================================================================
 
 class RateLimiter:
+    """
+    Sliding-window limiter: per IP, a deque of request times in arrival order.
+
+    Expired entries are popped from the left, so a check costs O(expired)
+    rather than rebuilding the list. Locks are sharded by IP so clients
+    don't contend with each other.
+    """
+
+    LOCK_SHARDS = 16
+
     def __init__(self, window: int, max_requests: int):
         self.window = window
         self.max_requests = max_requests
-        self.requests: Dict[str, list] = defaultdict(list)
-        self.lock = threading.Lock()
+        self.requests: Dict[str, deque] = defaultdict(deque)
+        self.locks = [threading.Lock() for _ in range(self.LOCK_SHARDS)]
+
+    def _lock(self, ip: str) -> threading.Lock:
+        return self.locks[hash(ip) % self.LOCK_SHARDS]
+
+    def _prune(self, times: deque, now: float):
+        cutoff = now - self.window
+        while times and times[0] <= cutoff:
+            times.popleft()
 
     def is_allowed(self, ip: str) -> bool:
-        now = time.time()
-        with self.lock:
-            self.requests[ip] = [t for t in self.requests[ip] if now - t < self.window]
-            if len(self.requests[ip]) >= self.max_requests:
+        now = time.monotonic()
+        with self._lock(ip):
+            times = self.requests[ip]
+            self._prune(times, now)
+            if len(times) >= self.max_requests:
                 return False
-            self.requests[ip].append(now)
+            times.append(now)
             return True
 
     def remaining(self, ip: str) -> int:
-        now = time.time()
-        with self.lock:
-            self.requests[ip] = [t for t in self.requests[ip] if now - t < self.window]
-            return max(0, self.max_requests - len(self.requests[ip]))
+        now = time.monotonic()
+        with self._lock(ip):
+            times = self.requests[ip]
+            self._prune(times, now)
+            return max(0, self.max_requests - len(times))
 
 
 rate_limiter = RateLimiter(RATE_LIMIT_WINDOW, RATE_LIMIT_MAX)
@@ -278,24 +599,250 @@ rate_limiter = RateLimiter(RATE_LIMIT_WINDOW, RATE_LIMIT_MAX)
 # Grading Logic
 # =============================================================================
 
-def extract_and_grade(zip_data: bytes, student_id: str) -> dict:
-    """Extract ZIP and run grading."""
-    with tempfile.TemporaryDirectory() as temp_dir:
+@functools.lru_cache(maxsize=None)
+def grader_fingerprint() -> bytes:
+    """
+    Digest of everything besides the ZIP that decides a grade: the grader,
+    the answer key and the hidden datasets (by name, size and mtime).
+    Computed once per server run.
+    """
+    h = hashlib.blake2b(digest_size=32)
+    for path in (GRADER_SCRIPT, EXPECTED_FILE):
+        h.update(path.read_bytes())
+    for entry in sorted(os.scandir(HIDDEN_DATA_DIR), key=lambda e: e.name):
+        st = entry.stat()
+        h.update(f"{entry.name}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+    return h.digest()
+
+
+def submission_hasher():
+    """
+    Hash object for an uploaded ZIP. It is keyed with grader_fingerprint(),
+    so cached results stop matching once the grader or its data change.
+    """
+    return hashlib.blake2b(digest_size=16, key=grader_fingerprint())
+
+
+class GraderPool:
+    """
+    Long-lived grader processes with grader.py already imported.
+
+    Workers are forked from a forkserver that preloads the grader, so a
+    job skips interpreter startup and module imports. A worker stays
+    reserved until its job actually finishes (even past a timeout); when
+    none is free, or the pool isn't running, try_run() returns False and
+    the caller falls back to a one-off subprocess.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.pool = None
+        self.slots = threading.BoundedSemaphore(workers)
+
+    def start(self):
+        if grader is None or self.pool is not None:
+            return
+        if 'forkserver' not in multiprocessing.get_all_start_methods():
+            return
+        ctx = multiprocessing.get_context('forkserver')
+        ctx.set_forkserver_preload(['grader'])
+        self.pool = ctx.Pool(self.workers)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def try_run(self, timeout: float, **kwargs) -> bool:
+        """Run grader.run(**kwargs) in a worker and wait for it."""
+        pool = self.pool
+        if pool is None or not self.slots.acquire(blocking=False):
+            return False
+
+        def release(_):
+            self.slots.release()
+
+        try:
+            job = pool.apply_async(grader.run, kwds=kwargs, callback=release, error_callback=release)
+        except BaseException:
+            self.slots.release()
+            raise
+        job.get(timeout)
+        return True
+
+
+grader_pool = GraderPool(GRADER_WORKERS)
+
+
+def read_body_chunks(rfile, length: int):
+    """Yield the request body in UPLOAD_CHUNK_SIZE pieces."""
+    remaining = length
+    while remaining > 0:
+        chunk = rfile.read(min(UPLOAD_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+class MultipartStream:
+    """
+    Incremental multipart/form-data parser.
+
+    feed() accepts the body in pieces of any size. When a part's headers
+    are complete, on_part(headers) is called with a dict of lower-cased
+    header names; it returns a sink callable to receive that part's body,
+    or None to skip it. The body goes to the sink in pieces, as memoryviews
+    over the internal buffer, so it is never copied or held in memory as
+    a whole.
+    """
+
+    MAX_HEADER_SIZE = 16 * 1024
+
+    def __init__(self, boundary: bytes, on_part):
+        self.delimiter = b'\r\n--' + boundary
+        self.on_part = on_part
+        self.buf = bytearray(b'\r\n')  # lets the opening boundary match `delimiter`
+        self.state = 'preamble'
+        self.sink = None
+
+    @property
+    def finished(self) -> bool:
+        """True once the closing boundary has been seen."""
+        return self.state == 'epilogue'
+
+    def feed(self, chunk: bytes):
+        buf = self.buf
+        buf += chunk
+        while True:
+            if self.state == 'body':
+                end = buf.find(self.delimiter)
+                if end == -1:
+                    # Hold back what could be the start of a delimiter
+                    self._emit(len(buf) - len(self.delimiter) + 1)
+                    return
+                self._emit(end)
+                del buf[:len(self.delimiter)]
+                self.sink = None
+                self.state = 'delimiter'
+
+            elif self.state == 'preamble':
+                start = buf.find(self.delimiter)
+                if start == -1:
+                    del buf[:max(0, len(buf) - len(self.delimiter) + 1)]
+                    return
+                del buf[:start + len(self.delimiter)]
+                self.state = 'delimiter'
+
+            elif self.state == 'delimiter':
+                # "--" closes the body; otherwise the line break before headers
+                if len(buf) < 2:
+                    return
+                if buf[:2] == b'--':
+                    self.state = 'epilogue'
+                    continue
+                if buf[:2] != b'\r\n':
+                    raise ValueError("malformed multipart boundary")
+                del buf[:2]
+                self.state = 'headers'
+
+            elif self.state == 'headers':
+                if buf[:2] == b'\r\n':
+                    end, block = 0, b''
+                else:
+                    end = buf.find(b'\r\n\r\n')
+                    if end == -1:
+                        if len(buf) > self.MAX_HEADER_SIZE:
+                            raise ValueError("multipart headers too large")
+                        return
+                    block = bytes(buf[:end])
+                    end += 2
+                del buf[:end + 2]
+                self.sink = self.on_part(self._parse_headers(block))
+                self.state = 'body'
+
+            else:  # epilogue
+                buf.clear()
+                return
+
+    def _emit(self, n: int):
+        if n <= 0:
+            return
+        if self.sink is not None:
+            with memoryview(self.buf) as view, view[:n] as piece:
+                self.sink(piece)
+        del self.buf[:n]
+
+    @staticmethod
+    def _parse_headers(block: bytes) -> Dict[str, str]:
+        headers = {}
+        for line in block.decode('latin-1').split('\r\n'):
+            name, sep, value = line.partition(':')
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        return headers
+
+
+def extract_zip(zf: zipfile.ZipFile, dest_dir: Path) -> bool:
+    """
+    Extract every member of `zf` under `dest_dir` in one pass over infolist().
+
+    All target paths are validated first; if any would land outside
+    `dest_dir` nothing is written and False is returned. Each directory is
+    created once, then members are copied in UPLOAD_CHUNK_SIZE blocks.
+    """
+    root = dest_dir.resolve()
+    members = []
+    dirs = set()
+    for info in zf.infolist():
+        target = (root / info.filename).resolve()
+        if target != root and not str(target).startswith(str(root) + os.sep):
+            return False
+        if info.is_dir():
+            dirs.add(target)
+        elif target != root:
+            # A file entry that resolves to the root itself (e.g. ".") has
+            # nowhere to go; skip it like an empty directory entry
+            dirs.add(target.parent)
+            members.append((info, target))
+
+    for d in sorted(dirs):
+        d.mkdir(parents=True, exist_ok=True)
+
+    for info, target in members:
+        with zf.open(info) as src, open(target, 'wb') as dst:
+            shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+    return True
+
+
+def extract_and_grade(zip_path: Path, student_id: str, digest: Optional[bytes] = None) -> dict:
+    """Extract the ZIP at `zip_path` and run grading.
+
+    With a `digest` from submission_hasher(), an identical earlier
+    submission's result is returned without grading, restamped for this
+    student, and a result where every dataset ran is stored for next time.
+    """
+    if digest is not None:
+        cached = get_cached_result(digest)
+        if cached is not None:
+            # The same ZIP may have come from someone else
+            cached["student_id"] = student_id
+            cached["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            return {"success": True, "result": cached, "cached": True}
+
+    with tempfile.TemporaryDirectory(dir=WORK_DIR) as temp_dir:
         temp_path = Path(temp_dir)
         submission_dir = temp_path / student_id
         submission_dir.mkdir()
 
-        zip_path = temp_path / "submission.zip"
-        with open(zip_path, 'wb') as f:
-            f.write(zip_data)
-
         try:
             with zipfile.ZipFile(zip_path, 'r') as zf:
-                for name in zf.namelist():
-                    if name.startswith('/') or '..' in name:
-                        return {"success": False, "error": "Invalid ZIP: path traversal detected"}
-                zf.extractall(submission_dir)
-        except zipfile.BadZipFile:
+                if not extract_zip(zf, submission_dir):
+                    return {"success": False, "error": "Invalid ZIP: path traversal detected"}
+        except (zipfile.BadZipFile, zipfile.LargeZipFile, OSError, RuntimeError):
+            # Encrypted members raise RuntimeError; clashing or unwritable
+            # entries raise OSError
             return {"success": False, "error": "Invalid ZIP file"}
 
         submission_root = find_submission_root(submission_dir)
@@ -305,122 +852,148 @@ def extract_and_grade(zip_data: bytes, student_id: str) -> dict:
         result_file = temp_path / "result.json"
 
         try:
-            result = subprocess.run(
-                [
-                    "python3", str(GRADER_SCRIPT),
-                    "--submission", str(submission_root),
-                    "--hidden-data", str(HIDDEN_DATA_DIR),
-                    "--expected", str(EXPECTED_FILE),
-                    "--output", str(result_file)
-                ],
-                capture_output=True,
-                text=True,
-                timeout=GRADING_TIMEOUT
+            stderr = ""
+            ran = grader_pool.try_run(
+                GRADING_TIMEOUT,
+                submission_dir=submission_root,
+                hidden_data_dir=HIDDEN_DATA_DIR,
+                expected_file=EXPECTED_FILE,
+                output_file=result_file,
             )
+            if not ran:
+                # No warm worker free: run the grader in a fresh interpreter
+                result = subprocess.run(
+                    [
+                        "python3", str(GRADER_SCRIPT),
+                        "--submission", str(submission_root),
+                        "--hidden-data", str(HIDDEN_DATA_DIR),
+                        "--expected", str(EXPECTED_FILE),
+                        "--output", str(result_file)
+                    ],
+                    capture_output=True,
+                    text=True,
+                    timeout=GRADING_TIMEOUT
+                )
+                stderr = result.stderr
 
             if result_file.exists():
-                with open(result_file) as f:
-                    return {"success": True, "result": json.load(f)}
+                result_json = result_file.read_text()
+                result = json.loads(result_json)
+                if digest is not None and is_cacheable_result(result):
+                    cache_result(digest, result_json)
+                return {"success": True, "result": result}
             else:
-                return {"success": False, "error": f"Grading failed: {result.stderr[:500]}"}
+                return {"success": False, "error": f"Grading failed: {stderr[:500]}"}
 
-        except subprocess.TimeoutExpired:
+        except (subprocess.TimeoutExpired, multiprocessing.TimeoutError):
             return {"success": False, "error": f"Timeout after {GRADING_TIMEOUT}s"}
         except Exception as e:
             return {"success": False, "error": str(e)}
 
 
-def find_submission_root(base_dir: Path) -> Optional[Path]:
-    """Find the actual submission root directory."""
-    if is_valid_submission(base_dir):
-        return base_dir
+def run_grading_job(zip_path: Path, student_id: str, client_ip: str, digest: bytes) -> dict:
+    """Grade an uploaded ZIP, record it, and build the response body."""
+    try:
+        result = extract_and_grade(zip_path, student_id, digest)
+    finally:
+        zip_path.unlink()
 
-    for subdir in base_dir.iterdir():
-        if subdir.is_dir():
-            if is_valid_submission(subdir):
-                return subdir
-            for subsubdir in subdir.iterdir():
-                if subsubdir.is_dir() and is_valid_submission(subsubdir):
-                    return subsubdir
-    return None
+    # Save to database
+    save_submission(student_id, client_ip, result)
 
+    result["student_id"] = student_id
+    result["timestamp"] = datetime.now().isoformat()
+    return result
 
-def is_valid_submission(path: Path) -> bool:
-    """Check if path contains a valid submission."""
-    if (path / "edge_proto_tool" / "main.py").exists():
-        return True
-    if (path / "main.py").exists():
-        return True
-    if (path / "edge_proto_tool").exists() and (path / "edge_proto_tool").is_file():
-        return True
-    return False
 
+class JobStore:
+    """
+    Grading jobs run off the HTTP thread, looked up by job id.
 
-# =============================================================================
-# HTTP Handler
-# =============================================================================
+    Jobs execute on a small thread pool (the grading itself happens in
+    grader processes). Finished jobs are kept for `retention` seconds so
+    clients can collect their result.
+    """
 
-class GradingHandler(BaseHTTPRequestHandler):
+    def __init__(self, workers: int, retention: float):
+        self.workers = workers
+        self.retention = retention
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.lock = threading.Lock()
+        self.jobs: Dict[str, tuple] = {}  # job_id -> (future, submitted_at)
 
-    def log_message(self, format, *args):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] {self.client_address[0]} - {format % args}")
+    def submit(self, fn, *args) -> tuple:
+        """Queue fn(*args); returns (job_id, future)."""
+        job_id = secrets.token_urlsafe(16)
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="grading")
+            future = self.executor.submit(fn, *args)
+            self.prune()
+            self.jobs[job_id] = (future, time.monotonic())
+        return job_id, future
+
+    def get(self, job_id: str) -> Optional[Future]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return job[0] if job is not None else None
 
-    def send_json(self, data: dict, status: int = 200):
-        body = json.dumps(data, indent=2).encode('utf-8')
-        self.send_response(status)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Content-Length', len(body))
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        self.wfile.write(body)
+    def prune(self):
+        """Forget finished jobs older than the retention window (lock held)."""
+        cutoff = time.monotonic() - self.retention
+        expired = [job_id for job_id, (future, submitted_at) in self.jobs.items()
+                   if submitted_at < cutoff and future.done()]
+        for job_id in expired:
+            del self.jobs[job_id]
 
-    def check_auth(self) -> bool:
-        """Check if request has valid API key."""
-        api_key = self.headers.get('X-API-Key', '')
-        return verify_api_key(api_key)
+    def close(self):
+        """Drop queued jobs and wait for running ones."""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
 
-    def do_OPTIONS(self):
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Student-ID, X-API-Key')
-        self.end_headers()
 
-    def do_GET(self):
-        parsed = urlparse(self.path)
+grading_jobs = JobStore(GRADER_WORKERS, JOB_RETENTION)
 
-        if parsed.path == '/health':
-            self.send_json({"status": "ok", "timestamp": datetime.now().isoformat()})
 
-        elif parsed.path == '/status':
-            self.send_json({
-                "status": "ok",
-                "stats": get_stats(),
-                "config": {
-                    "max_upload_size_mb": MAX_UPLOAD_SIZE / 1024 / 1024,
-                    "rate_limit_per_minute": RATE_LIMIT_MAX,
-                }
-            })
+def find_submission_root(base_dir: Path) -> Optional[Path]:
+    """Find the actual submission root directory.
 
-        elif parsed.path == '/results':
-            if not self.check_auth():
-                self.send_json({"error": "Unauthorized. Provide X-API-Key header."}, 401)
-                return
-            self.send_json({"results": get_all_results()})
+    Checks `base_dir`, then its subdirectories, then theirs, in one
+    scandir walk; directory type comes from the cached DirEntry.
+    """
+    base = str(base_dir)
+    if is_valid_submission(base):
+        return base_dir
 
-        elif parsed.path.startswith('/results/'):
-            if not self.check_auth():
-                self.send_json({"error": "Unauthorized. Provide X-API-Key header."}, 401)
-                return
-            student_id = parsed.path.split('/results/')[1]
-            self.send_json({"student_id": student_id, "results": get_student_results(student_id)})
+    with os.scandir(base) as entries:
+        subdirs = [e.path for e in entries if e.is_dir(follow_symlinks=False)]
+    for subdir in subdirs:
+        if is_valid_submission(subdir):
+            return Path(subdir)
+        with os.scandir(subdir) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False) and is_valid_submission(entry.path):
+                    return Path(entry.path)
+    return None
 
-        elif parsed.path == '/':
-            self.send_response(200)
-            self.send_header('Content-Type', 'text/html')
-            self.end_headers()
-            html = """<!DOCTYPE html>
+
+def is_valid_submission(path) -> bool:
+    """Check if path contains a valid submission."""
+    tool = os.path.join(path, "edge_proto_tool")
+    return (
+        os.path.isfile(os.path.join(tool, "main.py"))
+        or os.path.isfile(os.path.join(path, "main.py"))
+        or os.path.isfile(tool)  # compiled binary
+    )
+
+
+# =============================================================================
+# HTTP Handler
+# =============================================================================
+
+# Fixed response bodies, encoded once at import
+HTML_PAGE = """<!DOCTYPE html>
 <html>
 <head>
     <title>Edge-Proto Grading Server</title>
@@ -478,7 +1051,17 @@ class GradingHandler(BaseHTTPRequestHandler):
                     },
                     body: formData
                 });
-                const data = await response.json();
+                let data = await response.json();
+                // Submissions are graded in the background; poll until done
+                while (response.status === 202 || data.status === 'queued' || data.status === 'running') {
+                    resultDiv.textContent = 'Grading in progress... (' + data.status + ')';
+                    await new Promise(resolve => setTimeout(resolve, 1000));
+                    const poll = await fetch('/result/' + data.job_id, {
+                        headers: { 'X-API-Key': document.getElementById('apiKey').value }
+                    });
+                    data = await poll.json();
+                    if (poll.status === 404) break;
+                }
                 resultDiv.textContent = JSON.stringify(data, null, 2);
             } catch (error) {
                 resultDiv.textContent = 'Error: ' + error.message;
@@ -486,11 +1069,152 @@ class GradingHandler(BaseHTTPRequestHandler):
         });
     </script>
 </body>
-</html>"""
-            self.wfile.write(html.encode())
+</html>""".encode('utf-8')
+
+
+UNAUTHORIZED_JSON = json_dumps({"error": "Unauthorized. Provide X-API-Key header."})
+RATE_LIMITED_JSON = json_dumps({"error": "Rate limit exceeded. Try again later."})
+NOT_FOUND_JSON = json_dumps({"error": "Not found"})
+
+
+class GradingHandler(BaseHTTPRequestHandler):
+    # Keep-alive: every response carries Content-Length or is chunked, and
+    # a POST either consumes its body or closes the connection
+    protocol_version = 'HTTP/1.1'
+    timeout = 30  # seconds an idle keep-alive connection may hold its thread
+
+    def log_message(self, format, *args):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{timestamp}] {self.client_address[0]} - {format % args}")
+
+    def send_bytes(self, body: bytes, status: int = 200, content_type: str = 'application/json',
+                   close: bool = False):
+        """Send an already-encoded body.
+
+        Pass close=True when answering before the request body was read;
+        the unread bytes would otherwise be parsed as the next request.
+        """
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', len(body))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if close:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, data: dict, status: int = 200, close: bool = False):
+        self.send_bytes(json_dumps(data), status, close=close)
+
+    def send_json_stream(self, prefix: bytes, items, suffix: bytes, status: int = 200):
+        """
+        Send `prefix`, the items as comma-separated JSON values, then `suffix`,
+        encoding items as they are produced instead of building the whole body.
+
+        Uses chunked transfer encoding when both sides speak HTTP/1.1;
+        otherwise the body is delimited by closing the connection.
+        """
+        chunked = self.protocol_version >= 'HTTP/1.1' and self.request_version >= 'HTTP/1.1'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+
+        def write(data: bytes):
+            if chunked:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            else:
+                self.wfile.write(data)
+
+        buf = bytearray(prefix)
+        separator = b''
+        for item in items:
+            buf += separator
+            buf += json_dumps(item)
+            separator = b','
+            if len(buf) >= RESPONSE_CHUNK_SIZE:
+                write(bytes(buf))
+                buf.clear()
+        buf += suffix
+        write(bytes(buf))
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+
+    def check_auth(self) -> bool:
+        """Check if request has valid API key."""
+        api_key = self.headers.get('X-API-Key', '')
+        return verify_api_key(api_key)
+
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Student-ID, X-API-Key')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+
+        if parsed.path == '/health':
+            self.send_json({"status": "ok", "timestamp": datetime.now().isoformat()})
+
+        elif parsed.path == '/status':
+            self.send_json({
+                "status": "ok",
+                "stats": get_stats(),
+                "config": {
+                    "max_upload_size_mb": MAX_UPLOAD_SIZE / 1024 / 1024,
+                    "rate_limit_per_minute": RATE_LIMIT_MAX,
+                }
+            })
+
+        elif parsed.path == '/results':
+            if not self.check_auth():
+                self.send_bytes(UNAUTHORIZED_JSON, 401)
+                return
+            self.send_json_stream(b'{"results":[', iter_all_results(), b']}')
+
+        elif parsed.path.startswith('/results/'):
+            if not self.check_auth():
+                self.send_bytes(UNAUTHORIZED_JSON, 401)
+                return
+            student_id = parsed.path.split('/results/')[1]
+            if parse_qs(parsed.query).get('summary', ['0'])[0] not in ('', '0'):
+                results = get_student_results_summary(student_id)
+            else:
+                results = get_student_results(student_id)
+            self.send_json({"student_id": student_id, "results": results})
+
+        elif parsed.path.startswith('/result/'):
+            if not self.check_auth():
+                self.send_bytes(UNAUTHORIZED_JSON, 401)
+                return
+            job_id = parsed.path[len('/result/'):]
+            job = grading_jobs.get(job_id)
+            if job is None:
+                self.send_json({"error": "Unknown or expired job id"}, 404)
+            elif not job.done():
+                self.send_json({"job_id": job_id, "status": "running" if job.running() else "queued"})
+            else:
+                try:
+                    result = dict(job.result())
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+                result["job_id"] = job_id
+                result["status"] = "done"
+                self.send_json(result, 200 if result.get("success") else 400)
+
+        elif parsed.path == '/':
+            self.send_bytes(HTML_PAGE, 200, 'text/html; charset=utf-8')
 
         else:
-            self.send_json({"error": "Not found"}, 404)
+            self.send_bytes(NOT_FOUND_JSON, 404)
 
     def do_POST(self):
         parsed = urlparse(self.path)
@@ -499,12 +1223,12 @@ class GradingHandler(BaseHTTPRequestHandler):
         if parsed.path == '/submit':
             # Check API key
             if not self.check_auth():
-                self.send_json({"error": "Unauthorized. Provide X-API-Key header."}, 401)
+                self.send_bytes(UNAUTHORIZED_JSON, 401, close=True)
                 return
 
             # Rate limiting
             if not rate_limiter.is_allowed(client_ip):
-                self.send_json({"error": f"Rate limit exceeded. Try again later."}, 429)
+                self.send_bytes(RATE_LIMITED_JSON, 429, close=True)
                 return
 
             # Get student ID
@@ -514,48 +1238,75 @@ class GradingHandler(BaseHTTPRequestHandler):
             # Check content length
             content_length = int(self.headers.get('Content-Length', 0))
             if content_length > MAX_UPLOAD_SIZE:
-                self.send_json({"error": f"File too large. Max {MAX_UPLOAD_SIZE // 1024 // 1024} MB"}, 413)
+                self.send_json({"error": f"File too large. Max {MAX_UPLOAD_SIZE // 1024 // 1024} MB"}, 413, close=True)
                 return
 
-            # Read body
-            body = self.rfile.read(content_length)
-
-            # Parse multipart form data
+            # Stream the ZIP to disk rather than holding the body in memory
             content_type = self.headers.get('Content-Type', '')
-            zip_data = None
-
-            if 'multipart/form-data' in content_type:
-                boundary = content_type.split('boundary=')[1] if 'boundary=' in content_type else None
-                if boundary:
-                    boundary_bytes = f'--{boundary}'.encode()
-                    parts = body.split(boundary_bytes)
-                    for part in parts:
-                        if b'filename=' in part and b'.zip' in part.lower():
-                            data_start = part.find(b'\r\n\r\n')
-                            if data_start != -1:
-                                zip_data = part[data_start + 4:].rstrip(b'\r\n--')
-                                break
-            else:
-                zip_data = body
-
-            if zip_data is None:
+            chunks = read_body_chunks(self.rfile, content_length)
+            hasher = submission_hasher()
+
+            with tempfile.NamedTemporaryFile(suffix='.zip', dir=WORK_DIR, delete=False) as f:
+                zip_path = Path(f.name)
+
+                def write(data):
+                    f.write(data)
+                    hasher.update(data)
+
+                try:
+                    if 'multipart/form-data' in content_type:
+                        boundary = content_type.split('boundary=')[1] if 'boundary=' in content_type else None
+                        found = False
+
+                        def on_part(headers: Dict[str, str]):
+                            # Keep the first file part that looks like a ZIP
+                            nonlocal found
+                            disposition = headers.get('content-disposition', '')
+                            if found or 'filename=' not in disposition or '.zip' not in disposition.lower():
+                                return None
+                            found = True
+                            return write
+
+                        if boundary:
+                            parser = MultipartStream(boundary.encode(), on_part)
+                            try:
+                                for chunk in chunks:
+                                    parser.feed(chunk)
+                            except ValueError:
+                                found = False
+                    else:
+                        for chunk in chunks:
+                            write(chunk)
+                        found = True
+                    for _ in chunks:  # drain whatever a parse error left unread
+                        pass
+                    zip_size = f.tell()
+                except BaseException:
+                    zip_path.unlink()
+                    raise
+
+            if not found:
+                zip_path.unlink()
                 self.send_json({"error": "No ZIP file found"}, 400)
                 return
 
-            # Grade
-            self.log_message(f"Grading: {student_id} ({len(zip_data)} bytes)")
-            result = extract_and_grade(zip_data, student_id)
+            # Grade on the job pool; the job owns (and deletes) the temp file
+            self.log_message(f"Grading: {student_id} ({zip_size} bytes)")
+            job_id, job = grading_jobs.submit(run_grading_job, zip_path, student_id, client_ip, hasher.digest())
 
-            # Save to database
-            save_submission(student_id, client_ip, result)
-
-            # Response
-            result["student_id"] = student_id
-            result["timestamp"] = datetime.now().isoformat()
-            self.send_json(result, 200 if result.get("success") else 400)
+            if parse_qs(parsed.query).get('wait', ['0'])[0] not in ('', '0'):
+                result = job.result()
+                result["job_id"] = job_id
+                self.send_json(result, 200 if result.get("success") else 400)
+            else:
+                self.send_json({
+                    "job_id": job_id,
+                    "status": "queued",
+                    "result_url": f"/result/{job_id}",
+                }, 202)
 
         else:
-            self.send_json({"error": "Not found"}, 404)
+            self.send_bytes(NOT_FOUND_JSON, 404, close=True)
 
 
 # =============================================================================
@@ -596,7 +1347,7 @@ def main():
     init_database()
 
     # Start server
-    server = HTTPServer((args.host, args.port), GradingHandler)
+    server = ThreadingHTTPServer((args.host, args.port), GradingHandler)
 
     print("=" * 60)
     print("Edge-Proto Grading Server")
@@ -611,15 +1362,23 @@ def main():
     print(f"  GET  /status     - Stats")
     print(f"  GET  /results    - All results (auth required)")
     print(f"  POST /submit     - Submit (auth required)")
+    print(f"  GET  /result/ID  - Job status/result (auth required)")
     print("")
     print("Press Ctrl+C to stop")
     print("=" * 60)
 
+    db_writer.start()
+    grader_pool.start()
+
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         print("\nShutting down...")
-        server.shutdown()
+    finally:
+        server.server_close()
+        grading_jobs.close()
+        grader_pool.close()
+        db_writer.close()
 
 
 if __name__ == '__main__':
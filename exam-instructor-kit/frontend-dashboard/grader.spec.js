@@ -57,6 +57,10 @@ async function mockApiResponse(page, data) {
 
 test.describe('Frontend Dashboard Auto-Grader', () => {
 
+  // Tests share nothing but the read-only app and mock API, so let them run
+  // side by side even when the config doesn't ask for it
+  test.describe.configure({ mode: 'parallel' });
+
   test.beforeEach(async ({ page }) => {
     // Clear localStorage before each test
     await page.goto(APP_URL);
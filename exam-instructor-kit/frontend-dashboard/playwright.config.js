@@ -8,6 +8,10 @@ module.exports = defineConfig({
   testDir: './',
   testMatch: '**/grader.spec.js',
 
+  // Every test opens its own browser context (fresh localStorage), so tests
+  // can be spread across workers individually rather than file by file
+  fullyParallel: true,
+
   // Timeout settings
   timeout: 60000,
   expect: {
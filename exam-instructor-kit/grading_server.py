@@ -33,43 +33,106 @@ Submit Headers:
 """
 
 import argparse
+import atexit
+import functools
+import gzip
+import hashlib
+import hmac
 import json
 import os
+import queue
 import re
 import resource
 import secrets
 import shutil
 import signal
+import socket
 import sqlite3
 import subprocess
 import tempfile
 import time
+import urllib.request
 import zipfile
-from collections import defaultdict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.client import HTTPException
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-from urllib.parse import urlparse
+from typing import BinaryIO, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse, urlsplit
 import threading
 
+try:
+    import hyperscan
+except ImportError:  # optional; the danger scan falls back to the combined regex
+    hyperscan = None
+
+try:
+    import blake3
+except ImportError:  # optional; scan-cache keys fall back to hashlib.blake2b
+    blake3 = None
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; falls back to compact json.dumps
+    orjson = None
+
+
+def json_dumps(data, indent: bool = False) -> bytes:
+    """
+    Serialize to UTF-8 JSON, with orjson when it is installed: compact, or
+    indented by two spaces for responses people read.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else None)
+    if indent:
+        return json.dumps(data, indent=2).encode('utf-8')
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def json_loads(data):
+    """Parse JSON from bytes or str, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 # =============================================================================
 # Configuration
 # =============================================================================
 
 MAX_UPLOAD_SIZE = 50 * 1024 * 1024  # 50 MB (frontend projects can be larger)
+UPLOAD_CHUNK_SIZE = 64 * 1024  # uploads are streamed to disk in pieces this big
+MAX_PART_HEADER_SIZE = 16 * 1024
 RATE_LIMIT_WINDOW = 60  # seconds
 RATE_LIMIT_MAX = 10  # max submissions per window per IP
 GRADING_TIMEOUT = 120  # seconds (frontend tests take longer)
 
+# Submission ZIP limits, checked from the archive headers before anything
+# is scanned or extracted (zip-bomb guard)
+MAX_ZIP_ENTRIES = 10000
+MAX_ZIP_FILE_SIZE = 50 * 1024 * 1024  # uncompressed, per entry
+MAX_ZIP_TOTAL_SIZE = 200 * 1024 * 1024  # uncompressed, all entries
+
 # Paths (relative to script directory)
 SCRIPT_DIR = Path(__file__).parent.resolve()
 DATABASE_FILE = SCRIPT_DIR / "grading_results.db"
 API_KEY_FILE = SCRIPT_DIR / ".api_key"
 
+# Edge-proto scratch (uploaded ZIP, extracted submission, grader output) goes
+# on tmpfs when available, so it never touches the disk behind /tmp.
+# Frontend grading stays on the default temp dir: its npm installs are too
+# big to hold in RAM.
+SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else None
+EDGE_PROTO_WORK_DIR = SHM_DIR  # None: system default
+
 # Challenge-specific paths
 EDGE_PROTO_DIR = SCRIPT_DIR / "edge-proto"
 FRONTEND_DIR = SCRIPT_DIR / "frontend-dashboard"
+# Grader npm packages and Chromium, installed once and shared by all submissions
+GRADER_CACHE = FRONTEND_DIR / ".grader_cache"
 
 # Sandbox settings
 SANDBOX_ENABLED = True
@@ -78,6 +141,36 @@ SANDBOX_MAX_MEMORY = 512 * 1024 * 1024  # 512 MB
 SANDBOX_MAX_FILE_SIZE = 50 * 1024 * 1024  # 50 MB
 SANDBOX_MAX_PROCESSES = 50
 SANDBOX_MAX_OPEN_FILES = 256
+# Limited children are stopped by their own wall-clock timer; the Python-side
+# subprocess timeout is only a backstop this much later
+SANDBOX_TIMEOUT_GRACE = 10  # seconds
+
+# Danger scan parallelism: archives with fewer code files are scanned inline
+SCAN_WORKERS = os.cpu_count() or 1
+SCAN_PARALLEL_MIN_FILES = 16
+MAX_SCAN_BYTES = 2 * 1024 * 1024  # larger files (bundles, data) are not pattern-scanned
+
+# Background writer: commit up to this many queued rows per transaction,
+# waiting at most this long for a batch to fill
+DB_WRITE_BATCH_SIZE = 100
+DB_WRITE_BATCH_WAIT = 0.05  # seconds
+DB_POOL_SIZE = 8  # idle SQLite connections kept open between requests
+
+# Frontend installs share one npm download cache, so packages fetched for an
+# earlier submission are unpacked from disk instead of the registry
+NPM_CACHE_DIR = Path.home() / ".cache" / "grader-npm"
+NPM_INSTALL_FLAGS = ["--prefer-offline", "--no-audit", "--no-fund", "--ignore-scripts"]
+
+# The mock API is one long-lived process shared by all frontend gradings
+MOCK_API_PORT = 3001
+
+# Playwright workers per frontend submission (each runs its own Chromium)
+PLAYWRIGHT_WORKERS = min(os.cpu_count() or 1, 4)
+
+# Requests are served on their own threads; at most this many grade at once.
+# Frontend gradings also go one at a time, as the student app has a fixed port.
+GRADING_SEM = threading.BoundedSemaphore(max(1, (os.cpu_count() or 1) // 2))
+FRONTEND_GRADING_LOCK = threading.Lock()
 
 # =============================================================================
 # Sandbox - Security Module
@@ -141,93 +234,337 @@ DANGEROUS_PATTERNS = [
 # File extensions to scan
 SCANNABLE_EXTENSIONS = {'.py', '.js', '.ts', '.jsx', '.tsx', '.sh', '.bash', '.go', '.rs'}
 
+# Every pattern compiled once, plus a single alternation of all of them
+# (named group p<i> is pattern i) that locates candidate match positions.
+# The patterns are ASCII and run on raw file bytes, so nothing is decoded;
+# \b, \s and case folding therefore follow ASCII rules.
+_DANGER_REGEXES = [re.compile(pattern.encode(), re.IGNORECASE | re.MULTILINE) for pattern, _ in DANGEROUS_PATTERNS]
+_DANGER_COMBINED = re.compile(
+    b"|".join(b"(?P<p%d>%s)" % (i, pattern.encode()) for i, (pattern, _) in enumerate(DANGEROUS_PATTERNS)),
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Part of every scan-cache key, so cached findings expire when the rules
+# (or the way they are matched) change
+DANGEROUS_PATTERNS_VERSION = int.from_bytes(
+    hashlib.blake2b(repr(('bytes', DANGEROUS_PATTERNS)).encode(), digest_size=8).digest(), 'big', signed=True
+)
+
+
+def _build_hyperscan_db():
+    """Compile DANGEROUS_PATTERNS into a block-mode Hyperscan database (ids = list index)."""
+    if hyperscan is None:
+        return None
+    flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_MULTILINE | hyperscan.HS_FLAG_SINGLEMATCH
+    db = hyperscan.Database()
+    try:
+        db.compile(
+            expressions=[pattern.encode() for pattern, _ in DANGEROUS_PATTERNS],
+            ids=list(range(len(DANGEROUS_PATTERNS))),
+            elements=len(DANGEROUS_PATTERNS),
+            flags=flags,
+        )
+    except hyperscan.error as e:
+        print(f"Warning: Hyperscan could not compile the danger patterns ({e}); using re")
+        return None
+    return db
+
+
+_HS_DB = _build_hyperscan_db()
+_hs_local = threading.local()  # one Hyperscan scratch space per thread
+
+
+def _scan_hyperscan(content: bytes) -> set:
+    scratch = getattr(_hs_local, 'scratch', None)
+    if scratch is None:
+        scratch = _hs_local.scratch = hyperscan.Scratch(_HS_DB)
+    found = set()
+    # SINGLEMATCH: each pattern reports at most one match per scan
+    _HS_DB.scan(
+        content,
+        match_event_handler=lambda pattern_id, start, end, flags, ctx: found.add(pattern_id),
+        scratch=scratch,
+    )
+    return found
+
 
-def scan_code_for_dangers(directory: Path) -> Tuple[bool, List[str]]:
+def _scan_regex(content: bytes) -> set:
     """
-    Scan all code files in directory for dangerous patterns.
-    Returns (is_safe, list_of_warnings).
+    The combined regex finds the next position where any pattern matches;
+    the alternation reports the first one, and only the later patterns are
+    tried at that same position. Positions it skips match no pattern at all.
     """
-    warnings = []
+    found = set()
+    pos = 0
+    while len(found) < len(_DANGER_REGEXES):
+        m = _DANGER_COMBINED.search(content, pos)
+        if m is None:
+            break
+        start = m.start()
+        first = int(m.lastgroup[1:])
+        found.add(first)
+        for i in range(first + 1, len(_DANGER_REGEXES)):
+            if i not in found and _DANGER_REGEXES[i].match(content, start):
+                found.add(i)
+        pos = start + 1
+    return found
+
+
+def match_danger_patterns(content: bytes) -> List[str]:
+    """
+    Return the message of every DANGEROUS_PATTERNS entry found in content,
+    in list order. Uses Hyperscan when it is installed, else the combined regex.
+    """
+    if _HS_DB is not None:
+        found = _scan_hyperscan(content)
+    else:
+        found = _scan_regex(content)
+    return [DANGEROUS_PATTERNS[i][1] for i in sorted(found)]
+
+
+def content_digest(data: bytes) -> bytes:
+    """32-byte key for the scan cache: BLAKE3 when installed, else BLAKE2b."""
+    if blake3 is not None:
+        return blake3.blake3(data).digest()
+    return hashlib.blake2b(data, digest_size=32).digest()
+
+
+def get_cached_scan(digest: bytes) -> Optional[List[str]]:
+    """Messages cached for this file content under the current patterns, or None."""
+    try:
+        with db_pool.acquire() as conn:
+            row = conn.execute(
+                'SELECT warnings FROM scan_cache WHERE hash = ? AND pversion = ?',
+                (digest, DANGEROUS_PATTERNS_VERSION)
+            ).fetchone()
+    except sqlite3.Error:
+        return None
+    return json_loads(row[0]) if row else None
+
+
+def cache_scan(digest: bytes, messages: List[str]):
+    """Remember the messages for this file content; best effort."""
+    try:
+        with db_pool.acquire() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO scan_cache (hash, pversion, warnings) VALUES (?, ?, ?)',
+                (digest, DANGEROUS_PATTERNS_VERSION, json_dumps(messages).decode('utf-8'))
+            )
+    except sqlite3.Error:
+        pass
+
+
+def scan_bytes(data: bytes) -> List[str]:
+    """Danger messages for one file's contents, through the content-hash cache."""
+    # Identical content (vendored libs, resubmissions) reuses earlier findings
+    digest = content_digest(data)
+    messages = get_cached_scan(digest)
+    if messages is None:
+        messages = match_danger_patterns(data)
+        cache_scan(digest, messages)
+    return messages
+
+
+_scan_executor = None
+_scan_executor_lock = threading.Lock()
+
 
-    for file_path in directory.rglob('*'):
-        if not file_path.is_file():
+def get_scan_executor() -> ThreadPoolExecutor:
+    """Shared thread pool for the danger scan, created on first use."""
+    global _scan_executor
+    with _scan_executor_lock:
+        if _scan_executor is None:
+            _scan_executor = ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="scan")
+        return _scan_executor
+
+
+def shutdown_scan_executor():
+    global _scan_executor
+    with _scan_executor_lock:
+        if _scan_executor is not None:
+            _scan_executor.shutdown(cancel_futures=True)
+            _scan_executor = None
+
+
+def scan_zip_for_dangers(zf: zipfile.ZipFile) -> Tuple[bool, List[str]]:
+    """
+    Scan the code files in a submission archive for dangerous patterns,
+    reading the members straight out of it, so nothing has to be
+    extracted first.
+    Returns (is_safe, list_of_warnings).
+    """
+    # Members are read one at a time (the archive has a single file
+    # position); check_zip_entries has already capped their total size
+    payloads = []
+
+    for info in zf.infolist():
+        name = info.filename
+        # check_zip_entries rejects these archives outright
+        if info.is_dir() or is_unsafe_zip_path(name):
             continue
 
         # Skip node_modules, .git, etc.
-        if any(part.startswith('.') or part == 'node_modules' for part in file_path.parts):
+        if any(part.startswith('.') or part == 'node_modules' for part in name.split('/')):
             continue
 
         # Only scan known code files
-        if file_path.suffix.lower() not in SCANNABLE_EXTENSIONS:
+        if os.path.splitext(name)[1].lower() not in SCANNABLE_EXTENSIONS:
             continue
 
-        try:
-            content = file_path.read_text(errors='ignore')
-            rel_path = file_path.relative_to(directory)
+        if info.file_size > MAX_SCAN_BYTES:
+            continue
 
-            for pattern, message in DANGEROUS_PATTERNS:
-                matches = re.findall(pattern, content, re.IGNORECASE | re.MULTILINE)
-                if matches:
-                    warnings.append(f"{rel_path}: {message}")
+        try:
+            with zf.open(info) as f:
+                # Don't trust the header size: stop reading past the cap
+                data = f.read(MAX_SCAN_BYTES + 1)
+        except Exception:
+            # Skip members we can't read
+            continue
+        if len(data) > MAX_SCAN_BYTES:
+            continue
+        payloads.append((name, data))
+
+    # Hyperscan releases the GIL while it scans, so the payloads can be
+    # matched on several threads; the re fallback holds it, so stays inline.
+    # Warnings still come back in archive order
+    datas = [data for _, data in payloads]
+    if _HS_DB is not None and SCAN_WORKERS > 1 and len(payloads) >= SCAN_PARALLEL_MIN_FILES:
+        results = get_scan_executor().map(scan_bytes, datas)
+    else:
+        results = map(scan_bytes, datas)
 
-        except Exception as e:
-            # Skip files we can't read
-            pass
+    warnings = []
+    for (name, _), messages in zip(payloads, results):
+        for message in messages:
+            warnings.append(f"{name}: {message}")
 
     is_safe = len(warnings) == 0
     return is_safe, warnings
 
 
+@functools.lru_cache(maxsize=1)
 def detect_sandbox_tool() -> Optional[str]:
-    """Detect available sandboxing tools."""
-    # Check for firejail (most feature-rich)
-    try:
-        result = subprocess.run(['firejail', '--version'], capture_output=True, timeout=5)
-        if result.returncode == 0:
-            return 'firejail'
-    except:
-        pass
+    """Detect available sandboxing tools (once per process; the result is cached)."""
+    # Check for firejail (most feature-rich); skip the spawn if it isn't on PATH
+    firejail = shutil.which('firejail')
+    if firejail:
+        try:
+            result = subprocess.run([firejail, '--version'], capture_output=True, timeout=5)
+            if result.returncode == 0:
+                return 'firejail'
+        except (OSError, subprocess.SubprocessError):
+            pass
 
     # Check for bubblewrap (lightweight)
-    try:
-        result = subprocess.run(['bwrap', '--version'], capture_output=True, timeout=5)
-        if result.returncode == 0:
-            return 'bubblewrap'
-    except:
-        pass
+    bwrap = shutil.which('bwrap')
+    if bwrap:
+        try:
+            result = subprocess.run([bwrap, '--version'], capture_output=True, timeout=5)
+            if result.returncode == 0:
+                return 'bubblewrap'
+        except (OSError, subprocess.SubprocessError):
+            pass
 
     # Fallback to basic resource limits
     return None
 
 
-SANDBOX_TOOL = None  # Will be set on startup
-
+SANDBOX_TOOL = detect_sandbox_tool()
 
-def set_resource_limits():
-    """Set resource limits for child process (used with preexec_fn)."""
-    try:
-        # CPU time limit
-        resource.setrlimit(resource.RLIMIT_CPU, (SANDBOX_MAX_CPU_TIME, SANDBOX_MAX_CPU_TIME))
 
-        # Memory limit (address space)
-        resource.setrlimit(resource.RLIMIT_AS, (SANDBOX_MAX_MEMORY, SANDBOX_MAX_MEMORY))
+# (resource, limit, prlimit option) applied to every sandboxed child
+SANDBOX_RLIMITS = [
+    (resource.RLIMIT_CPU, SANDBOX_MAX_CPU_TIME, 'cpu'),  # CPU time limit
+    (resource.RLIMIT_AS, SANDBOX_MAX_MEMORY, 'as'),  # Memory limit (address space)
+    (resource.RLIMIT_FSIZE, SANDBOX_MAX_FILE_SIZE, 'fsize'),  # File size limit
+    (resource.RLIMIT_NPROC, SANDBOX_MAX_PROCESSES, 'nproc'),  # Number of processes
+    (resource.RLIMIT_NOFILE, SANDBOX_MAX_OPEN_FILES, 'nofile'),  # Number of open files
+    (resource.RLIMIT_CORE, 0, 'core'),  # Core dump size (disable)
+]
 
-        # File size limit
-        resource.setrlimit(resource.RLIMIT_FSIZE, (SANDBOX_MAX_FILE_SIZE, SANDBOX_MAX_FILE_SIZE))
 
-        # Number of processes
-        resource.setrlimit(resource.RLIMIT_NPROC, (SANDBOX_MAX_PROCESSES, SANDBOX_MAX_PROCESSES))
+def set_resource_limits(wall_timeout: Optional[float] = None):
+    """Set resource limits for child process (used with preexec_fn).
 
-        # Number of open files
-        resource.setrlimit(resource.RLIMIT_NOFILE, (SANDBOX_MAX_OPEN_FILES, SANDBOX_MAX_OPEN_FILES))
+    With wall_timeout, also arm a real-time timer: the pending SIGALRM
+    survives exec and kills the child once the time is up.
+    """
+    try:
+        for res, limit, _ in SANDBOX_RLIMITS:
+            resource.setrlimit(res, (limit, limit))
 
-        # Core dump size (disable)
-        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        if wall_timeout:
+            signal.setitimer(signal.ITIMER_REAL, wall_timeout)
 
     except Exception as e:
         print(f"Warning: Could not set resource limits: {e}")
 
 
+@functools.lru_cache(maxsize=1)
+def prlimit_prefix() -> Optional[Tuple[str, ...]]:
+    """
+    `prlimit --cpu=... -- ` launcher that applies SANDBOX_RLIMITS and execs
+    the command, or None if util-linux prlimit isn't installed. Limits are
+    clamped to this process's hard limits, which an unprivileged child
+    could not raise anyway.
+    """
+    prlimit = shutil.which('prlimit')
+    if prlimit is None:
+        return None
+    options = []
+    for res, limit, option in SANDBOX_RLIMITS:
+        hard = resource.getrlimit(res)[1]
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        options.append(f'--{option}={limit}')
+    return (prlimit, *options, '--')
+
+
+@functools.lru_cache(maxsize=1)
+def timeout_binary() -> Optional[str]:
+    """Path of coreutils `timeout`, or None."""
+    return shutil.which('timeout')
+
+
+def limit_command(command: List[str], timeout: Optional[float] = None) -> Tuple[List[str], Optional[callable]]:
+    """
+    Return (command, preexec_fn) that start `command` under SANDBOX_RLIMITS,
+    and, with timeout, stop it after that many seconds of wall-clock time.
+
+    With prlimit the limits are set by the launcher (and the deadline by
+    coreutils timeout), so no Python runs between fork and exec and
+    subprocess can take its vfork/posix_spawn fast path; otherwise fall
+    back to set_resource_limits as preexec_fn.
+    """
+    prefix = prlimit_prefix()
+    if prefix is None:
+        return command, functools.partial(set_resource_limits, timeout)
+    if timeout and timeout_binary():
+        # TERM at the deadline, KILL if it is still running 5s later
+        command = [timeout_binary(), '--kill-after=5', str(timeout), *command]
+    return [*prefix, *command], None
+
+
+# Exit statuses of a child stopped by limit_command's time limits: coreutils
+# timeout (124 after TERM), the SIGALRM timer, or RLIMIT_CPU
+TIME_LIMIT_STATUSES = frozenset({124, -signal.SIGALRM, -signal.SIGXCPU})
+
+# A bare SIGKILL, seen directly or through timeout/a shell (128 + 9): the
+# kernel (RLIMIT_AS, OOM) or stop_process_group, not necessarily the clock
+KILLED_STATUSES = frozenset({128 + signal.SIGKILL, -signal.SIGKILL})
+
+
+def hit_time_limit(returncode: int) -> bool:
+    """True if a limit_command child was stopped for running too long."""
+    return returncode in TIME_LIMIT_STATUSES
+
+
+def was_killed(returncode: int) -> bool:
+    """True if a child was SIGKILLed, typically for a memory/resource limit."""
+    return returncode in KILLED_STATUSES
+
+
 def get_safe_environment() -> dict:
     """Get a sanitized environment for running untrusted code."""
     # Start with minimal environment
@@ -251,8 +588,6 @@ def get_safe_environment() -> dict:
 
 def wrap_command_with_sandbox(command: List[str], working_dir: Path) -> List[str]:
     """Wrap a command with sandbox tool if available."""
-    global SANDBOX_TOOL
-
     if not SANDBOX_ENABLED or SANDBOX_TOOL is None:
         return command
 
@@ -311,16 +646,20 @@ def run_sandboxed(
     """
     # Wrap with sandbox tool if available
     sandboxed_cmd = wrap_command_with_sandbox(command, working_dir)
+    sandboxed_cmd, preexec_fn = limit_command(sandboxed_cmd, timeout)
 
-    return subprocess.run(
+    result = subprocess.run(
         sandboxed_cmd,
         cwd=working_dir,
         capture_output=capture_output,
         text=True,
-        timeout=timeout,
+        timeout=timeout + SANDBOX_TIMEOUT_GRACE,
         env=get_safe_environment(),
-        preexec_fn=set_resource_limits
+        preexec_fn=preexec_fn
     )
+    if hit_time_limit(result.returncode):
+        raise subprocess.TimeoutExpired(sandboxed_cmd, timeout, output=result.stdout, stderr=result.stderr)
+    return result
 
 
 # =============================================================================
@@ -332,83 +671,275 @@ def generate_api_key() -> str:
     return secrets.token_urlsafe(32)
 
 
+# (file signature, key, key as UTF-8) from the last read; the file is re-read
+# only when its mtime, size or inode changes (e.g. after --generate-key)
+_api_key_cache: Tuple[Optional[tuple], Optional[str], bytes] = (None, None, b'')
+
+
+def _cached_api_key() -> Tuple[Optional[str], bytes]:
+    global _api_key_cache
+    try:
+        st = os.stat(API_KEY_FILE)
+    except FileNotFoundError:
+        return None, b''
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+    cache = _api_key_cache
+    if signature != cache[0]:
+        key = API_KEY_FILE.read_text().strip()
+        cache = _api_key_cache = (signature, key, key.encode('utf-8'))
+    return cache[1], cache[2]
+
+
 def load_api_key() -> Optional[str]:
-    """Load API key from file."""
-    if API_KEY_FILE.exists():
-        return API_KEY_FILE.read_text().strip()
-    return None
+    """Load API key from file (cached until the file changes)."""
+    return _cached_api_key()[0]
 
 
 def save_api_key(key: str):
     """Save API key to file."""
+    global _api_key_cache
     API_KEY_FILE.write_text(key)
     os.chmod(API_KEY_FILE, 0o600)
+    _api_key_cache = (None, None, b'')
 
 
 def verify_api_key(provided_key: str) -> bool:
-    """Verify provided API key."""
-    stored_key = load_api_key()
-    if stored_key is None:
+    """Verify provided API key.
+
+    Compared as bytes: compare_digest refuses non-ASCII str, and header
+    values can hold any Latin-1 character.
+    """
+    stored_key, stored_bytes = _cached_api_key()
+    if not stored_key or not provided_key:
         return False
-    return secrets.compare_digest(provided_key, stored_key)
+    return hmac.compare_digest(provided_key.encode('utf-8'), stored_bytes)
 
 
 # =============================================================================
 # Database
 # =============================================================================
 
+SUBMISSION_INSERT_SQL = '''
+    INSERT INTO submissions
+    (student_id, challenge, timestamp, ip_address, total_score, max_score,
+     grade, passed, result_json, error_message)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+SELECT_RESULTS_SQL = '''
+    SELECT id, student_id, challenge, timestamp, ip_address, total_score,
+           max_score, grade, passed, error_message
+    FROM submissions
+    ORDER BY timestamp DESC
+'''
+
+SELECT_CHALLENGE_RESULTS_SQL = '''
+    SELECT id, student_id, challenge, timestamp, ip_address, total_score,
+           max_score, grade, passed, error_message
+    FROM submissions
+    WHERE challenge = ?
+    ORDER BY timestamp DESC
+'''
+
+SELECT_STUDENT_RESULTS_SQL = '''
+    SELECT id, student_id, challenge, timestamp, ip_address, total_score,
+           max_score, grade, passed, result_json, error_message
+    FROM submissions
+    WHERE student_id = ?
+    ORDER BY timestamp DESC
+'''
+
+
+class ConnectionPool:
+    """
+    Long-lived SQLite connections shared by the handler threads.
+
+    The HTTP server starts a thread per connection, so connections are kept
+    in an idle queue rather than per thread: a request reuses one that is
+    already open and configured. At most `size` idle connections are kept;
+    extras are closed on release.
+
+    WAL lets readers run alongside the writer and NORMAL sync skips most
+    fsyncs. Autocommit (isolation_level=None) so each statement commits
+    unless wrapped in an explicit BEGIN.
+    """
+
+    def __init__(self, path: Path, size: int):
+        self.path = path
+        self.size = size
+        self.idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            str(self.path), timeout=10, isolation_level=None, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        conn.executescript(
+            "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; PRAGMA temp_store=MEMORY;"
+        )
+        return conn
+
+    @contextmanager
+    def acquire(self):
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            conn = self.connect()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            if self.idle.qsize() < self.size:
+                self.idle.put(conn)
+            else:
+                conn.close()
+
+
+db_pool = ConnectionPool(DATABASE_FILE, DB_POOL_SIZE)
+
+
 def init_database():
     """Initialize SQLite database."""
-    conn = sqlite3.connect(str(DATABASE_FILE))
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS submissions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_id TEXT NOT NULL,
-            challenge TEXT NOT NULL,
-            timestamp TEXT NOT NULL,
-            ip_address TEXT,
-            total_score REAL,
-            max_score REAL,
-            grade TEXT,
-            passed INTEGER,
-            result_json TEXT,
-            error_message TEXT
-        )
-    ''')
+    with db_pool.acquire() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS submissions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                student_id TEXT NOT NULL,
+                challenge TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                ip_address TEXT,
+                total_score REAL,
+                max_score REAL,
+                grade TEXT,
+                passed INTEGER,
+                result_json TEXT,
+                error_message TEXT
+            )
+        ''')
+
+        # Per-student history, newest first, straight off the index (no sort).
+        # Supersedes the old single-column student_id index.
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_student_challenge ON submissions(student_id, timestamp DESC)
+        ''')
+        cursor.execute('DROP INDEX IF EXISTS idx_student_id')
+
+        # Covers every column get_stats aggregates, so stats are an index-only
+        # scan; its challenge prefix also replaces the old challenge index
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_challenge_cover
+            ON submissions(challenge, passed, student_id, total_score)
+        ''')
+        cursor.execute('DROP INDEX IF EXISTS idx_challenge')
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_timestamp ON submissions(timestamp)
+        ''')
+
+        # Danger-scan findings by file content hash (see scan_bytes)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scan_cache (
+                hash BLOB PRIMARY KEY,
+                pversion INTEGER NOT NULL,
+                warnings TEXT NOT NULL
+            )
+        ''')
+
+
+class BatchWriter:
+    """
+    Single background thread that commits queued writes.
+
+    Each write is an (sql, params) pair. Writes are drained in batches,
+    grouped by statement and sent with one executemany per statement
+    inside one transaction, so a burst of submissions shares a single
+    commit.
+    """
+
+    def __init__(self, batch_size: int, batch_wait: float):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name="db-writer", daemon=True)
+                self.thread.start()
 
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_student_id ON submissions(student_id)
-    ''')
+    def submit(self, sql: str, params: tuple, done: Optional[threading.Event] = None):
+        """Queue one write; `done` is set once it has been committed."""
+        self.start()
+        self.queue.put((sql, params, done))
 
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_challenge ON submissions(challenge)
-    ''')
+    def close(self):
+        """Flush everything queued so far and stop the thread."""
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is not None:
+            self.queue.put(None)
+            thread.join()
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self.flush(batch)
+
+    def flush(self, batch: list):
+        rows_by_sql: Dict[str, list] = {}
+        for sql, params, _ in batch:
+            rows_by_sql.setdefault(sql, []).append(params)
+        try:
+            with db_pool.acquire() as conn:
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    for sql, rows in rows_by_sql.items():
+                        conn.executemany(sql, rows)
+                    conn.execute("COMMIT")
+                except sqlite3.Error as e:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    print(f"[db-writer] Failed to save {len(batch)} row(s): {e}")
+        finally:
+            for _, _, done in batch:
+                if done is not None:
+                    done.set()
 
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_timestamp ON submissions(timestamp)
-    ''')
 
-    conn.commit()
-    conn.close()
+db_writer = BatchWriter(DB_WRITE_BATCH_SIZE, DB_WRITE_BATCH_WAIT)
+atexit.register(db_writer.close)  # don't lose queued rows on exit
 
 
-def save_submission(student_id: str, challenge: str, ip_address: str, result: dict):
-    """Save submission result to database."""
-    conn = sqlite3.connect(str(DATABASE_FILE))
-    cursor = conn.cursor()
+def save_submission(student_id: str, challenge: str, ip_address: str, result: dict, wait: bool = False):
+    """Save submission result to database.
 
+    The row is committed by the background writer; pass wait=True to block
+    until it is durable.
+    """
     timestamp = datetime.now().isoformat()
 
     if result.get("success"):
         r = result.get("result", {})
-        cursor.execute('''
-            INSERT INTO submissions
-            (student_id, challenge, timestamp, ip_address, total_score, max_score,
-             grade, passed, result_json, error_message)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        params = (
             student_id,
             challenge,
             timestamp,
@@ -417,109 +948,81 @@ def save_submission(student_id: str, challenge: str, ip_address: str, result: di
             r.get("max_score", 100),
             r.get("grade", "F"),
             1 if r.get("passed") else 0,
-            json.dumps(r),
+            json_dumps(r).decode('utf-8'),
             None
-        ))
+        )
     else:
-        cursor.execute('''
-            INSERT INTO submissions
-            (student_id, challenge, timestamp, ip_address, total_score, max_score,
-             grade, passed, result_json, error_message)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        params = (
             student_id,
             challenge,
             timestamp,
             ip_address,
             0, 100, "F", 0, None,
             result.get("error", "Unknown error")
-        ))
+        )
 
-    conn.commit()
-    conn.close()
+    done = threading.Event() if wait else None
+    db_writer.submit(SUBMISSION_INSERT_SQL, params, done)
+    if done is not None:
+        done.wait()
 
 
 def get_all_results(challenge: Optional[str] = None) -> list:
     """Get all submission results."""
-    conn = sqlite3.connect(str(DATABASE_FILE))
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    if challenge:
-        cursor.execute('''
-            SELECT id, student_id, challenge, timestamp, ip_address, total_score,
-                   max_score, grade, passed, error_message
-            FROM submissions
-            WHERE challenge = ?
-            ORDER BY timestamp DESC
-        ''', (challenge,))
-    else:
-        cursor.execute('''
-            SELECT id, student_id, challenge, timestamp, ip_address, total_score,
-                   max_score, grade, passed, error_message
-            FROM submissions
-            ORDER BY timestamp DESC
-        ''')
-
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return results
+    with db_pool.acquire() as conn:
+        if challenge:
+            rows = conn.execute(SELECT_CHALLENGE_RESULTS_SQL, (challenge,))
+        else:
+            rows = conn.execute(SELECT_RESULTS_SQL)
+        return [dict(row) for row in rows]
 
 
 def get_student_results(student_id: str) -> list:
     """Get results for a specific student."""
-    conn = sqlite3.connect(str(DATABASE_FILE))
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    with db_pool.acquire() as conn:
+        rows = conn.execute(SELECT_STUDENT_RESULTS_SQL, (student_id,))
+        return [dict(row) for row in rows]
+
 
-    cursor.execute('''
-        SELECT id, student_id, challenge, timestamp, ip_address, total_score,
-               max_score, grade, passed, result_json, error_message
-        FROM submissions
-        WHERE student_id = ?
-        ORDER BY timestamp DESC
-    ''', (student_id,))
+STATS_BY_CHALLENGE_SQL = '''
+    SELECT challenge,
+           COUNT(*),
+           SUM(passed = 1),
+           COUNT(DISTINCT student_id),
+           AVG(CASE WHEN total_score > 0 THEN total_score END)
+    FROM submissions
+    GROUP BY challenge
+'''
 
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return results
+STATS_TOTALS_SQL = 'SELECT COUNT(*), COUNT(DISTINCT student_id) FROM submissions'
 
 
 def get_stats() -> dict:
     """Get submission statistics."""
-    conn = sqlite3.connect(str(DATABASE_FILE))
-    cursor = conn.cursor()
-
     stats = {"challenges": {}}
 
+    # Known challenges are always listed, even before their first submission
     for challenge in ["edge-proto", "frontend"]:
-        cursor.execute('SELECT COUNT(*) FROM submissions WHERE challenge = ?', (challenge,))
-        total = cursor.fetchone()[0]
-
-        cursor.execute('SELECT COUNT(*) FROM submissions WHERE challenge = ? AND passed = 1', (challenge,))
-        passed = cursor.fetchone()[0]
-
-        cursor.execute('SELECT COUNT(DISTINCT student_id) FROM submissions WHERE challenge = ?', (challenge,))
-        unique = cursor.fetchone()[0]
-
-        cursor.execute('SELECT AVG(total_score) FROM submissions WHERE challenge = ? AND total_score > 0', (challenge,))
-        avg = cursor.fetchone()[0] or 0
-
         stats["challenges"][challenge] = {
-            "total_submissions": total,
-            "passed": passed,
-            "failed": total - passed,
-            "unique_students": unique,
-            "average_score": round(avg, 1)
+            "total_submissions": 0,
+            "passed": 0,
+            "failed": 0,
+            "unique_students": 0,
+            "average_score": 0
         }
 
-    cursor.execute('SELECT COUNT(*) FROM submissions')
-    stats["total_submissions"] = cursor.fetchone()[0]
+    with db_pool.acquire() as conn:
+        for challenge, total, passed, unique, avg in conn.execute(STATS_BY_CHALLENGE_SQL):
+            stats["challenges"][challenge] = {
+                "total_submissions": total,
+                "passed": passed,
+                "failed": total - passed,
+                "unique_students": unique,
+                "average_score": round(avg or 0, 1)
+            }
 
-    cursor.execute('SELECT COUNT(DISTINCT student_id) FROM submissions')
-    stats["unique_students"] = cursor.fetchone()[0]
+        stats["total_submissions"], stats["unique_students"] = conn.execute(STATS_TOTALS_SQL).fetchone()
 
-    conn.close()
     return stats
 
 
@@ -528,21 +1031,67 @@ def get_stats() -> dict:
 # =============================================================================
 
 class RateLimiter:
+    """
+    Token bucket per IP: up to max_requests at once, refilled continuously
+    at max_requests per window.
+
+    Each IP is a single (tokens, last_update) pair, so a check is O(1)
+    whatever the request history. IPs are sharded across LOCK_SHARDS dicts,
+    each with its own lock, so unrelated clients don't contend; a background
+    sweeper drops IPs whose bucket has refilled, which is the same as never
+    having seen them.
+    """
+
+    LOCK_SHARDS = 16
+
     def __init__(self, window: int, max_requests: int):
         self.window = window
         self.max_requests = max_requests
-        self.requests: Dict[str, list] = defaultdict(list)
-        self.lock = threading.Lock()
+        self.refill_rate = max_requests / window  # tokens per second
+        self.shards = [({}, threading.Lock()) for _ in range(self.LOCK_SHARDS)]
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def _shard(self, ip: str) -> Tuple[Dict[str, Tuple[float, float]], threading.Lock]:
+        return self.shards[hash(ip) % self.LOCK_SHARDS]
 
     def is_allowed(self, ip: str) -> bool:
-        now = time.time()
-        with self.lock:
-            self.requests[ip] = [t for t in self.requests[ip] if now - t < self.window]
-            if len(self.requests[ip]) >= self.max_requests:
+        now = time.monotonic()
+        buckets, lock = self._shard(ip)
+        with lock:
+            tokens, last = buckets.get(ip, (self.max_requests, now))
+            tokens = min(self.max_requests, tokens + (now - last) * self.refill_rate)
+            if tokens < 1:
+                buckets[ip] = (tokens, now)
                 return False
-            self.requests[ip].append(now)
+            buckets[ip] = (tokens - 1, now)
             return True
 
+    def sweep(self):
+        """Forget IPs idle for a whole window: their buckets are full again."""
+        cutoff = time.monotonic() - self.window
+        for buckets, lock in self.shards:
+            with lock:
+                stale = [ip for ip, (_, last) in buckets.items() if last <= cutoff]
+                for ip in stale:
+                    del buckets[ip]
+
+    def start_sweeper(self):
+        if self._sweeper is None:
+            self._stop.clear()
+            self._sweeper = threading.Thread(target=self._sweep_loop, name="rate-limit-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def stop_sweeper(self):
+        if self._sweeper is not None:
+            self._stop.set()
+            self._sweeper.join()
+            self._sweeper = None
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.window):
+            self.sweep()
+
 
 rate_limiter = RateLimiter(RATE_LIMIT_WINDOW, RATE_LIMIT_MAX)
 
@@ -551,7 +1100,48 @@ rate_limiter = RateLimiter(RATE_LIMIT_WINDOW, RATE_LIMIT_MAX)
 # Edge-Proto Grading
 # =============================================================================
 
-def grade_edge_proto(zip_data: bytes, student_id: str) -> dict:
+def is_unsafe_zip_path(name: str) -> bool:
+    """
+    Whether a member name could land outside the extraction directory:
+    absolute, drive-qualified, or with a ".." component (either
+    separator). Names that merely contain "..", like "x..py", are fine.
+    """
+    return name.startswith(('/', '\\')) or name[1:2] == ':' or '..' in name.replace('\\', '/').split('/')
+
+
+def check_zip_entries(zf: zipfile.ZipFile) -> Optional[str]:
+    """
+    Reject path traversal and oversized archives using only the central
+    directory. Extraction never writes more than an entry's declared
+    size, so these header checks bound what hits the disk.
+    Returns an error message, or None if the archive is acceptable.
+    """
+    infos = zf.infolist()
+    if len(infos) > MAX_ZIP_ENTRIES:
+        return f"Invalid ZIP: more than {MAX_ZIP_ENTRIES} entries"
+
+    total = 0
+    for info in infos:
+        name = info.filename
+        if is_unsafe_zip_path(name):
+            return "Invalid ZIP: path traversal detected"
+        if info.file_size > MAX_ZIP_FILE_SIZE:
+            return f"Invalid ZIP: {name} is larger than {MAX_ZIP_FILE_SIZE // 1024 // 1024} MB uncompressed"
+        total += info.file_size
+        if total > MAX_ZIP_TOTAL_SIZE:
+            return f"Invalid ZIP: contents exceed {MAX_ZIP_TOTAL_SIZE // 1024 // 1024} MB uncompressed"
+    return None
+
+
+def submission_members(zf: zipfile.ZipFile) -> List[zipfile.ZipInfo]:
+    """Entries worth extracting: everything but macOS Finder metadata."""
+    return [
+        info for info in zf.infolist()
+        if not info.filename.startswith('__MACOSX/') and info.filename.rsplit('/', 1)[-1] != '.DS_Store'
+    ]
+
+
+def grade_edge_proto(zip_path: Path, student_id: str) -> dict:
     """Grade edge-proto challenge submission."""
     grader_script = EDGE_PROTO_DIR / "grader.py"
     hidden_data = EDGE_PROTO_DIR / "hidden_data"
@@ -561,34 +1151,32 @@ def grade_edge_proto(zip_data: bytes, student_id: str) -> dict:
         if not path.exists():
             return {"success": False, "error": f"Server config error: {name} not found"}
 
-    with tempfile.TemporaryDirectory() as temp_dir:
+    with tempfile.TemporaryDirectory(dir=EDGE_PROTO_WORK_DIR) as temp_dir:
         temp_path = Path(temp_dir)
         submission_dir = temp_path / student_id
         submission_dir.mkdir()
 
-        zip_path = temp_path / "submission.zip"
-        with open(zip_path, 'wb') as f:
-            f.write(zip_data)
-
         try:
             with zipfile.ZipFile(zip_path, 'r') as zf:
-                for name in zf.namelist():
-                    if name.startswith('/') or '..' in name:
-                        return {"success": False, "error": "Invalid ZIP: path traversal detected"}
-                zf.extractall(submission_dir)
+                error = check_zip_entries(zf)
+                if error:
+                    return {"success": False, "error": error}
+
+                # SECURITY: Scan code for dangerous patterns (straight from
+                # the archive; nothing is extracted unless it passes)
+                if SANDBOX_ENABLED:
+                    is_safe, warnings = scan_zip_for_dangers(zf)
+                    if not is_safe:
+                        return {
+                            "success": False,
+                            "error": f"SECURITY: Dangerous code detected - submission rejected",
+                            "security_warnings": warnings[:10]  # Limit to first 10
+                        }
+
+                zf.extractall(submission_dir, members=submission_members(zf))
         except zipfile.BadZipFile:
             return {"success": False, "error": "Invalid ZIP file"}
 
-        # SECURITY: Scan code for dangerous patterns
-        if SANDBOX_ENABLED:
-            is_safe, warnings = scan_code_for_dangers(submission_dir)
-            if not is_safe:
-                return {
-                    "success": False,
-                    "error": f"SECURITY: Dangerous code detected - submission rejected",
-                    "security_warnings": warnings[:10]  # Limit to first 10
-                }
-
         # Find submission root
         submission_root = find_edge_proto_root(submission_dir)
         if submission_root is None:
@@ -599,25 +1187,36 @@ def grade_edge_proto(zip_data: bytes, student_id: str) -> dict:
         try:
             # Run grader with sandboxing
             # Note: The grader itself runs the student code, so we apply limits there
+            command = [
+                "python3", str(grader_script),
+                "--submission", str(submission_root),
+                "--hidden-data", str(hidden_data),
+                "--expected", str(expected_file),
+                "--output", str(result_file)
+            ]
+            preexec_fn = None
+            backstop = GRADING_TIMEOUT
+            if SANDBOX_ENABLED:
+                # The child enforces GRADING_TIMEOUT itself
+                command, preexec_fn = limit_command(command, GRADING_TIMEOUT)
+                backstop += SANDBOX_TIMEOUT_GRACE
+
             result = subprocess.run(
-                [
-                    "python3", str(grader_script),
-                    "--submission", str(submission_root),
-                    "--hidden-data", str(hidden_data),
-                    "--expected", str(expected_file),
-                    "--output", str(result_file)
-                ],
+                command,
                 cwd=temp_path,
                 capture_output=True,
                 text=True,
-                timeout=GRADING_TIMEOUT,
+                timeout=backstop,
                 env=get_safe_environment() if SANDBOX_ENABLED else None,
-                preexec_fn=set_resource_limits if SANDBOX_ENABLED else None
+                preexec_fn=preexec_fn
             )
 
             if result_file.exists():
-                with open(result_file) as f:
-                    return {"success": True, "result": json.load(f)}
+                return {"success": True, "result": json_loads(result_file.read_bytes())}
+            elif SANDBOX_ENABLED and hit_time_limit(result.returncode):
+                return {"success": False, "error": f"Timeout after {GRADING_TIMEOUT}s"}
+            elif SANDBOX_ENABLED and was_killed(result.returncode):
+                return {"success": False, "error": "Grading killed (memory/resource limit)"}
             else:
                 return {"success": False, "error": f"Grading failed: {result.stderr[:500]}"}
 
@@ -628,36 +1227,250 @@ def grade_edge_proto(zip_data: bytes, student_id: str) -> dict:
 
 
 def find_edge_proto_root(base_dir: Path) -> Optional[Path]:
-    """Find the actual submission root directory."""
-    if is_valid_edge_proto(base_dir):
+    """Find the actual submission root directory.
+
+    Checks `base_dir`, then its subdirectories, then theirs; directory
+    type comes from the cached DirEntry instead of a stat per entry.
+    """
+    base = str(base_dir)
+    if is_valid_edge_proto(base):
         return base_dir
 
-    for subdir in base_dir.iterdir():
-        if subdir.is_dir():
-            if is_valid_edge_proto(subdir):
-                return subdir
-            for subsubdir in subdir.iterdir():
-                if subsubdir.is_dir() and is_valid_edge_proto(subsubdir):
-                    return subsubdir
+    with os.scandir(base) as entries:
+        subdirs = [e.path for e in entries if e.is_dir()]
+    for subdir in subdirs:
+        if is_valid_edge_proto(subdir):
+            return Path(subdir)
+        with os.scandir(subdir) as entries:
+            for entry in entries:
+                if entry.is_dir() and is_valid_edge_proto(entry.path):
+                    return Path(entry.path)
     return None
 
 
-def is_valid_edge_proto(path: Path) -> bool:
-    """Check if path contains a valid edge-proto submission."""
-    if (path / "edge_proto_tool" / "main.py").exists():
-        return True
-    if (path / "main.py").exists():
-        return True
-    if (path / "edge_proto_tool").exists() and (path / "edge_proto_tool").is_file():
+def is_valid_edge_proto(path) -> bool:
+    """Check if path contains a valid edge-proto submission.
+
+    One scandir of `path` answers the membership checks; only a package
+    directory costs a second lookup (for its main.py).
+    """
+    try:
+        with os.scandir(path) as entries:
+            is_file = {e.name: e.is_file() for e in entries}
+    except OSError:
+        return False
+
+    if "main.py" in is_file:
         return True
-    return False
+    tool = is_file.get("edge_proto_tool")
+    if tool is None:
+        return False
+    # A file is the compiled binary; a directory must hold main.py
+    return tool or os.path.exists(os.path.join(path, "edge_proto_tool", "main.py"))
 
 
 # =============================================================================
 # Frontend Grading
 # =============================================================================
 
-def grade_frontend(zip_data: bytes, student_id: str) -> dict:
+def stop_process_group(proc: subprocess.Popen, grace: float = 5.0):
+    """
+    SIGTERM the process group led by proc (started with start_new_session),
+    give the leader `grace` seconds to exit, then SIGKILL whatever is left
+    of the group and reap the leader. The final SIGKILL matters: a dev
+    server's children can outlive npm and keep holding the app port.
+    """
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+    try:
+        proc.wait(timeout=grace)
+    except subprocess.TimeoutExpired:
+        pass
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    proc.wait()
+
+
+class StreamTail:
+    """
+    Drain a child's output pipe on a background thread, keeping only its
+    last lines, so the child never blocks on a full pipe and a chatty one
+    can't grow the server's memory.
+    """
+
+    def __init__(self, stream, max_lines: int = 64):
+        self.lines: deque = deque(maxlen=max_lines)
+        self._thread = threading.Thread(target=self._drain, args=(stream,), daemon=True)
+        self._thread.start()
+
+    def _drain(self, stream):
+        with stream:
+            for line in stream:
+                self.lines.append(line)
+
+    def text(self, wait: Optional[float] = None) -> str:
+        """The kept lines, after waiting up to `wait` seconds for EOF."""
+        self._thread.join(wait)
+        return b''.join(list(self.lines)).decode(errors='replace')
+
+
+def run_install_step(command: List[str], cwd: Path, timeout: int,
+                     env: Optional[dict] = None) -> subprocess.CompletedProcess:
+    """
+    Run an install command to completion in its own session; raises
+    CalledProcessError on failure.
+
+    On timeout the whole session is killed, not just the leader: npm's
+    children would otherwise keep the stderr pipe open.
+    """
+    proc = subprocess.Popen(
+        command,
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=env,
+        start_new_session=True
+    )
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        proc.communicate()
+        raise
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, command, stdout, stderr)
+    return subprocess.CompletedProcess(command, 0, stdout, stderr)
+
+
+def npm_environment() -> dict:
+    return {**os.environ, "NPM_CONFIG_CACHE": str(NPM_CACHE_DIR)}
+
+
+def install_npm_deps(project_dir: Path, timeout: int):
+    """
+    Install a project's packages through the shared cache: npm ci when it
+    ships a lockfile (falling back to npm install if the lockfile is out of
+    sync with package.json), npm install otherwise.
+    """
+    env = npm_environment()
+    if (project_dir / "package-lock.json").exists() or (project_dir / "npm-shrinkwrap.json").exists():
+        try:
+            return run_install_step(["npm", "ci", *NPM_INSTALL_FLAGS], project_dir, timeout, env)
+        except subprocess.CalledProcessError:
+            pass
+    return run_install_step(["npm", "install", *NPM_INSTALL_FLAGS], project_dir, timeout, env)
+
+
+def grader_environment() -> dict:
+    return {**npm_environment(), "PLAYWRIGHT_BROWSERS_PATH": str(GRADER_CACHE / "ms-playwright")}
+
+
+_grader_lock = threading.Lock()
+_grader_ready = False
+
+
+def prewarm_grader() -> Optional[str]:
+    """
+    Install the grader's npm packages and the Chromium build they expect into
+    GRADER_CACHE, unless a previous run already did so for the current
+    package.json. Safe to call from several threads; later calls return at
+    once. Returns an error message, or None when the cache is ready.
+    """
+    global _grader_ready
+    with _grader_lock:
+        if _grader_ready:
+            return None
+
+        package_json = (FRONTEND_DIR / "package.json").read_bytes()
+        stamp = GRADER_CACHE / ".installed"
+        if not (stamp.exists() and stamp.read_bytes() == package_json
+                and (GRADER_CACHE / "node_modules").is_dir()):
+            GRADER_CACHE.mkdir(exist_ok=True)
+            stamp.unlink(missing_ok=True)
+            (GRADER_CACHE / "package.json").write_bytes(package_json)
+            try:
+                install_npm_deps(GRADER_CACHE, 300)
+                run_install_step(["npx", "playwright", "install", "chromium"], GRADER_CACHE, 300, grader_environment())
+            except subprocess.CalledProcessError as e:
+                return (e.stderr or "")[:300]
+            except subprocess.TimeoutExpired:
+                return "timed out"
+            stamp.write_bytes(package_json)
+
+        _grader_ready = True
+        return None
+
+
+class MockApiServer:
+    """
+    The frontend grader's mock API, started once and shared by submissions.
+
+    In test mode it answers every request the same way, so there is no need
+    to cold-start node for each submission. It is restarted only if it has
+    exited or was switched out of test mode (POST /test/set-mode is open to
+    the student apps it serves).
+    """
+
+    def __init__(self, script: Path, port: int):
+        self.script = script
+        self.url = f"http://localhost:{port}"
+        self.port = port
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _healthy(self) -> bool:
+        try:
+            with urllib.request.urlopen(self.url + "/health", timeout=2) as response:
+                return json_loads(response.read()).get("mode") == "test"
+        except (OSError, HTTPException, ValueError):
+            return False
+
+    def ensure_running(self) -> Optional[str]:
+        """Return the API's URL, (re)starting it first if needed; None if it won't start."""
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None and self._healthy():
+                return self.url
+
+            self._stop()
+            self._proc = subprocess.Popen(
+                ["node", str(self.script), "--mode=test", f"--port={self.port}"],
+                cwd=self.script.parent,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True
+            )
+            if wait_for_server(self.url + "/health", timeout=10) and self._proc.poll() is None:
+                return self.url
+            self._stop()
+            return None
+
+    def stop(self):
+        with self._lock:
+            self._stop()
+
+    def _stop(self):
+        if self._proc is not None:
+            stop_process_group(self._proc)
+            self._proc = None
+
+
+mock_api_server = MockApiServer(FRONTEND_DIR / "mock-api-server.js", MOCK_API_PORT)
+
+# Looked up once, like SANDBOX_TOOL, rather than probed on every submission
+NODE_AVAILABLE = all(shutil.which(tool) for tool in ("node", "npm", "npx"))
+
+
+def grade_frontend(zip_path: Path, student_id: str) -> dict:
     """Grade frontend dashboard challenge submission."""
     grader_spec = FRONTEND_DIR / "grader.spec.js"
     mock_api = FRONTEND_DIR / "mock-api-server.js"
@@ -667,10 +1480,7 @@ def grade_frontend(zip_data: bytes, student_id: str) -> dict:
         if not path.exists():
             return {"success": False, "error": f"Server config error: {name} not found"}
 
-    # Check if node/npm is available
-    try:
-        subprocess.run(["node", "--version"], capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    if not NODE_AVAILABLE:
         return {"success": False, "error": "Node.js not installed on grading server"}
 
     with tempfile.TemporaryDirectory() as temp_dir:
@@ -678,29 +1488,27 @@ def grade_frontend(zip_data: bytes, student_id: str) -> dict:
         submission_dir = temp_path / "submission"
         submission_dir.mkdir()
 
-        zip_path = temp_path / "submission.zip"
-        with open(zip_path, 'wb') as f:
-            f.write(zip_data)
-
         try:
             with zipfile.ZipFile(zip_path, 'r') as zf:
-                for name in zf.namelist():
-                    if name.startswith('/') or '..' in name:
-                        return {"success": False, "error": "Invalid ZIP: path traversal detected"}
-                zf.extractall(submission_dir)
+                error = check_zip_entries(zf)
+                if error:
+                    return {"success": False, "error": error}
+
+                # SECURITY: Scan code for dangerous patterns (straight from
+                # the archive; nothing is extracted unless it passes)
+                if SANDBOX_ENABLED:
+                    is_safe, warnings = scan_zip_for_dangers(zf)
+                    if not is_safe:
+                        return {
+                            "success": False,
+                            "error": f"SECURITY: Dangerous code detected - submission rejected",
+                            "security_warnings": warnings[:10]
+                        }
+
+                zf.extractall(submission_dir, members=submission_members(zf))
         except zipfile.BadZipFile:
             return {"success": False, "error": "Invalid ZIP file"}
 
-        # SECURITY: Scan code for dangerous patterns
-        if SANDBOX_ENABLED:
-            is_safe, warnings = scan_code_for_dangers(submission_dir)
-            if not is_safe:
-                return {
-                    "success": False,
-                    "error": f"SECURITY: Dangerous code detected - submission rejected",
-                    "security_warnings": warnings[:10]
-                }
-
         # Find submission root (contains package.json)
         submission_root = find_frontend_root(submission_dir)
         if submission_root is None:
@@ -710,59 +1518,32 @@ def grade_frontend(zip_data: bytes, student_id: str) -> dict:
         grading_dir = temp_path / "grading"
         grading_dir.mkdir()
 
-        # Copy grading files
+        # Copy grading files; their packages come from the shared cache
         shutil.copy(grader_spec, grading_dir)
-        shutil.copy(mock_api, grading_dir)
         shutil.copy(playwright_config, grading_dir)
         shutil.copy(FRONTEND_DIR / "package.json", grading_dir)
+        error = prewarm_grader()
+        if error:
+            return {"success": False, "error": f"Failed to install grading deps: {error}"}
+        (grading_dir / "node_modules").symlink_to(GRADER_CACHE / "node_modules", target_is_directory=True)
 
-        mock_api_proc = None
         app_proc = None
+        test_proc = None
         app_port = 3000
-        api_port = 3001
 
         try:
-            # Install grading dependencies
-            print(f"[{student_id}] Installing grading dependencies...")
-            install_result = subprocess.run(
-                ["npm", "install"],
-                cwd=grading_dir,
-                capture_output=True,
-                text=True,
-                timeout=120
-            )
-            if install_result.returncode != 0:
-                return {"success": False, "error": f"Failed to install grading deps: {install_result.stderr[:300]}"}
-
-            # Install Playwright browser
-            subprocess.run(
-                ["npx", "playwright", "install", "chromium"],
-                cwd=grading_dir,
-                capture_output=True,
-                timeout=120
-            )
-
             # Install student app dependencies
             print(f"[{student_id}] Installing student app dependencies...")
-            student_install = subprocess.run(
-                ["npm", "install"],
-                cwd=submission_root,
-                capture_output=True,
-                text=True,
-                timeout=180
-            )
-            if student_install.returncode != 0:
-                return {"success": False, "error": f"Failed to install student deps: {student_install.stderr[:300]}"}
-
-            # Start mock API server
-            print(f"[{student_id}] Starting mock API server...")
-            mock_api_proc = subprocess.Popen(
-                ["node", str(grading_dir / "mock-api-server.js"), "--mode=test", f"--port={api_port}"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                preexec_fn=os.setsid
-            )
-            time.sleep(2)
+            try:
+                install_npm_deps(submission_root, 180)
+            except subprocess.CalledProcessError as e:
+                return {"success": False, "error": f"Failed to install student deps: {(e.stderr or '')[:300]}"}
+
+            # Mock API server (already running unless this is the first
+            # submission or it needs a restart)
+            api_url = mock_api_server.ensure_running()
+            if api_url is None:
+                return {"success": False, "error": "Mock API failed to start"}
 
             # Start student app
             print(f"[{student_id}] Starting student app...")
@@ -772,36 +1553,45 @@ def grade_frontend(zip_data: bytes, student_id: str) -> dict:
             app_proc = subprocess.Popen(
                 ["npm", "start"],
                 cwd=submission_root,
-                stdout=subprocess.PIPE,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
                 stderr=subprocess.PIPE,
                 env=env,
-                preexec_fn=os.setsid
+                start_new_session=True
             )
+            app_stderr = StreamTail(app_proc.stderr)
 
             # Wait for app to start
             print(f"[{student_id}] Waiting for app to start...")
             app_ready = wait_for_server(f"http://localhost:{app_port}", timeout=60)
             if not app_ready:
-                stderr = app_proc.stderr.read().decode() if app_proc.stderr else ""
-                return {"success": False, "error": f"Student app failed to start: {stderr[:500]}"}
+                # The app may still be running; take whatever it has printed
+                stderr = app_stderr.text(wait=0 if app_proc.poll() is None else 1)
+                return {"success": False, "error": f"Student app failed to start: {stderr[-500:]}"}
 
-            # Run Playwright tests
+            # Run Playwright tests; the JSON report goes to a file so only
+            # the tail of stderr is held in memory
             print(f"[{student_id}] Running Playwright tests...")
-            test_result = subprocess.run(
-                ["npx", "playwright", "test", "--reporter=json"],
-                cwd=grading_dir,
-                capture_output=True,
-                text=True,
-                timeout=180,
-                env={
-                    **os.environ,
-                    "APP_URL": f"http://localhost:{app_port}",
-                    "API_URL": f"http://localhost:{api_port}"
-                }
-            )
+            report_path = grading_dir / "report.json"
+            with open(report_path, 'wb') as report:
+                test_proc = subprocess.Popen(
+                    ["npx", "playwright", "test", "--reporter=json", f"--workers={PLAYWRIGHT_WORKERS}"],
+                    cwd=grading_dir,
+                    stdin=subprocess.DEVNULL,
+                    stdout=report,
+                    stderr=subprocess.PIPE,
+                    env={
+                        **grader_environment(),
+                        "APP_URL": f"http://localhost:{app_port}",
+                        "API_URL": api_url
+                    },
+                    start_new_session=True
+                )
+            test_stderr = StreamTail(test_proc.stderr)
+            test_proc.wait(timeout=180)
 
             # Parse test results
-            result = parse_playwright_results(test_result.stdout, test_result.stderr)
+            result = parse_playwright_results(report_path.read_bytes(), test_stderr.text(wait=1))
             return result
 
         except subprocess.TimeoutExpired:
@@ -809,112 +1599,135 @@ def grade_frontend(zip_data: bytes, student_id: str) -> dict:
         except Exception as e:
             return {"success": False, "error": str(e)}
         finally:
-            # Cleanup processes
-            if mock_api_proc:
-                try:
-                    os.killpg(os.getpgid(mock_api_proc.pid), signal.SIGTERM)
-                except:
-                    pass
-            if app_proc:
-                try:
-                    os.killpg(os.getpgid(app_proc.pid), signal.SIGTERM)
-                except:
-                    pass
+            # Cleanup processes (and their children) before the next run
+            # needs the app port
+            for proc in (test_proc, app_proc):
+                if proc is not None:
+                    stop_process_group(proc)
+
+
+# Directories that never hold the project root; not worth listing
+FRONTEND_ROOT_SKIP_DIRS = {"node_modules", ".git", "__MACOSX"}
 
 
 def find_frontend_root(base_dir: Path) -> Optional[Path]:
-    """Find the actual submission root directory (contains package.json)."""
-    if (base_dir / "package.json").exists():
+    """Find the actual submission root directory (contains package.json).
+
+    Checks `base_dir`, then each subdirectory followed by its children;
+    directory type comes from the cached DirEntry, and vendored trees such
+    as an accidentally zipped node_modules are never listed.
+    """
+    base = str(base_dir)
+    if os.path.exists(os.path.join(base, "package.json")):
         return base_dir
 
-    for subdir in base_dir.iterdir():
-        if subdir.is_dir():
-            if (subdir / "package.json").exists():
-                return subdir
-            for subsubdir in subdir.iterdir():
-                if subsubdir.is_dir() and (subsubdir / "package.json").exists():
-                    return subsubdir
+    with os.scandir(base) as entries:
+        subdirs = [e.path for e in entries
+                   if e.is_dir(follow_symlinks=False) and e.name not in FRONTEND_ROOT_SKIP_DIRS]
+    for subdir in subdirs:
+        if os.path.exists(os.path.join(subdir, "package.json")):
+            return Path(subdir)
+        with os.scandir(subdir) as entries:
+            for entry in entries:
+                if (entry.is_dir(follow_symlinks=False) and entry.name not in FRONTEND_ROOT_SKIP_DIRS
+                        and os.path.exists(os.path.join(entry.path, "package.json"))):
+                    return Path(entry.path)
     return None
 
 
 def wait_for_server(url: str, timeout: int = 30) -> bool:
-    """Wait for a server to become available."""
-    import urllib.request
-    start = time.time()
-    while time.time() - start < timeout:
+    """
+    Wait for a server to become available.
+
+    Polls with bare TCP connects, which fail fast while nothing is
+    listening; only once the port accepts is the URL fetched, to catch
+    servers that listen before they can serve (dev servers still bundling).
+    """
+    parts = urlsplit(url)
+    address = (parts.hostname, parts.port or 80)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
         try:
-            urllib.request.urlopen(url, timeout=2)
+            socket.create_connection(address, timeout=0.1).close()
+            urllib.request.urlopen(url, timeout=2).close()
             return True
-        except:
-            time.sleep(1)
+        except (OSError, HTTPException):
+            time.sleep(0.05)
     return False
 
 
-def parse_playwright_results(stdout: str, stderr: str) -> dict:
+# Points per grader.spec.js test, by title
+TEST_SCORES = {
+    'should display correct average latency': 10,
+    'should display correct max latency': 10,
+    'should show alert when max latency exceeds threshold': 7.5,
+    'should NOT show alert when max latency is below threshold': 7.5,
+    'should render chart with correct number of data points': 15,
+    'should poll API every 5 seconds': 15,
+    'should initialize with default threshold in localStorage': 4,
+    'should allow threshold adjustment and persist to localStorage': 4,
+    'should show threshold line in chart': 4,
+    'should highlight data points above threshold': 4,
+    'should persist threshold across page reloads': 4,
+    'should retain data from last 10 minutes': 10,
+    'should display error message when API fails': 2.5,
+    'should continue polling after API failure': 2.5,
+}
+MAX_SCORE = sum(TEST_SCORES.values())
+
+TESTS_RAN_RE = re.compile(r'passed|failed', re.IGNORECASE)
+
+
+def iter_specs(suites: list):
+    """Every spec in a Playwright JSON report, including those in describe blocks."""
+    for suite in suites:
+        yield from suite.get('specs', ())
+        yield from iter_specs(suite.get('suites', ()))
+
+
+def parse_playwright_results(stdout: bytes, stderr: str) -> dict:
     """Parse Playwright JSON output and calculate score."""
-    # Test scoring map
-    test_scores = {
-        'should display correct average latency': 10,
-        'should display correct max latency': 10,
-        'should show alert when max latency exceeds threshold': 7.5,
-        'should NOT show alert when max latency is below threshold': 7.5,
-        'should render chart with correct number of data points': 15,
-        'should poll API every 5 seconds': 15,
-        'should initialize with default threshold in localStorage': 4,
-        'should allow threshold adjustment and persist to localStorage': 4,
-        'should show threshold line in chart': 4,
-        'should highlight data points above threshold': 4,
-        'should persist threshold across page reloads': 4,
-        'should retain data from last 10 minutes': 10,
-        'should display error message when API fails': 2.5,
-        'should continue polling after API failure': 2.5,
-    }
-
     total_score = 0
-    max_score = 100
     test_results = []
 
     try:
         # Try to parse JSON from stdout
-        results = json.loads(stdout)
-
-        if 'suites' in results:
-            for suite in results['suites']:
-                if 'specs' in suite:
-                    for spec in suite['specs']:
-                        test_title = spec.get('title', '')
-                        test_ok = spec.get('ok', False)
-
-                        if test_title in test_scores:
-                            points = test_scores[test_title]
-                            if test_ok:
-                                total_score += points
-                            test_results.append({
-                                "test": test_title,
-                                "passed": test_ok,
-                                "points": points if test_ok else 0,
-                                "max_points": points
-                            })
-
-        percentage = (total_score / max_score) * 100
+        results = json_loads(stdout)
+
+        for spec in iter_specs(results.get('suites', ())):
+            test_title = spec.get('title', '')
+            points = TEST_SCORES.get(test_title)
+            if points is None:
+                continue
+            test_ok = spec.get('ok', False)
+            if test_ok:
+                total_score += points
+            test_results.append({
+                "test": test_title,
+                "passed": test_ok,
+                "points": points if test_ok else 0,
+                "max_points": points
+            })
+
+        percentage = (total_score / MAX_SCORE) * 100
         grade = calculate_grade(percentage)
 
         return {
             "success": True,
             "result": {
                 "total_score": total_score,
-                "max_score": max_score,
+                "max_score": MAX_SCORE,
                 "percentage": percentage,
                 "grade": grade,
-                "passed": total_score >= 60,
+                "passed": percentage >= 60,
                 "tests": test_results,
-                "summary": f"Score: {total_score}/{max_score}, Grade: {grade}"
+                "summary": f"Score: {total_score}/{MAX_SCORE}, Grade: {grade}"
             }
         }
 
     except json.JSONDecodeError:
         # Couldn't parse JSON, try to extract info from stderr
-        if "passed" in stderr.lower() or "failed" in stderr.lower():
+        if TESTS_RAN_RE.search(stderr):
             return {
                 "success": False,
                 "error": f"Tests completed but couldn't parse results. Output: {stderr[:500]}"
@@ -939,6 +1752,88 @@ def calculate_grade(percentage: float) -> str:
         return "F"
 
 
+# =============================================================================
+# Upload Parsing
+# =============================================================================
+
+def copy_stream(rfile: BinaryIO, out: BinaryIO, length: int) -> int:
+    """Copy up to length bytes from rfile to out in chunks; returns bytes copied."""
+    copied = 0
+    while copied < length:
+        chunk = rfile.read(min(UPLOAD_CHUNK_SIZE, length - copied))
+        if not chunk:
+            break
+        out.write(chunk)
+        copied += len(chunk)
+    return copied
+
+
+def parse_multipart_stream(rfile: BinaryIO, boundary: bytes, length: int, out: BinaryIO) -> bool:
+    """
+    Write the first .zip file part of a multipart/form-data body to out.
+
+    The body (length bytes of rfile) is read in UPLOAD_CHUNK_SIZE chunks and
+    consumed in full; besides the current chunk only a delimiter's worth of
+    bytes is held back, so memory stays flat however large the upload.
+    Returns False if the body has no such part.
+    """
+    delimiter = b'--' + boundary
+    separator = b'\r\n' + delimiter
+    keep = len(separator) - 1
+    remaining = length
+    buf = b''
+
+    def fill() -> bool:
+        nonlocal buf, remaining
+        chunk = rfile.read(min(UPLOAD_CHUNK_SIZE, remaining)) if remaining > 0 else b''
+        remaining = remaining - len(chunk) if chunk else 0
+        buf += chunk
+        return bool(chunk)
+
+    try:
+        # Preamble up to the first delimiter
+        while (start := buf.find(delimiter)) == -1:
+            buf = buf[-keep:]
+            if not fill():
+                return False
+        buf = buf[start + len(delimiter):]
+
+        while True:
+            # "--" right after a delimiter closes the body
+            while len(buf) < 2 and fill():
+                pass
+            if buf.startswith(b'--'):
+                return False
+
+            while (end := buf.find(b'\r\n\r\n')) == -1:
+                if len(buf) > MAX_PART_HEADER_SIZE or not fill():
+                    return False
+            headers, buf = buf[:end], buf[end + 4:]
+            is_zip = b'filename=' in headers and b'.zip' in headers.lower()
+
+            # Part body, up to the next delimiter
+            while (end := buf.find(separator)) == -1:
+                if is_zip and len(buf) > keep:
+                    out.write(buf[:-keep])
+                buf = buf[-keep:]
+                if not fill():
+                    # Unterminated body: take what arrived, like a closed one
+                    if is_zip:
+                        out.write(buf.rstrip(b'\r\n-'))
+                    return is_zip
+            if is_zip:
+                out.write(buf[:end])
+                return True
+            buf = buf[end + len(separator):]
+    finally:
+        # Discard the rest so the connection is left at a request boundary
+        while remaining > 0:
+            chunk = rfile.read(min(UPLOAD_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+
+
 # =============================================================================
 # HTTP Handler
 # =============================================================================
@@ -950,7 +1845,7 @@ class GradingHandler(BaseHTTPRequestHandler):
         print(f"[{timestamp}] {self.client_address[0]} - {format % args}")
 
     def send_json(self, data: dict, status: int = 200):
-        body = json.dumps(data, indent=2).encode('utf-8')
+        body = json_dumps(data, indent=True)
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
         self.send_header('Content-Length', len(body))
@@ -1011,11 +1906,16 @@ class GradingHandler(BaseHTTPRequestHandler):
             self.send_json({"student_id": student_id, "results": get_student_results(student_id)})
 
         elif parsed.path == '/':
+            gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+            body = _WEB_UI_GZIP if gzipped else _WEB_UI_BODY
             self.send_response(200)
             self.send_header('Content-Type', 'text/html')
+            if gzipped:
+                self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', len(body))
+            self.send_header('Vary', 'Accept-Encoding')
             self.end_headers()
-            html = self.get_web_ui()
-            self.wfile.write(html.encode())
+            self.wfile.write(body)
 
         else:
             self.send_json({"error": "Not found"}, 404)
@@ -1050,38 +1950,34 @@ class GradingHandler(BaseHTTPRequestHandler):
                 self.send_json({"error": f"File too large. Max {MAX_UPLOAD_SIZE // 1024 // 1024} MB"}, 413)
                 return
 
-            # Read body
-            body = self.rfile.read(content_length)
-
-            # Parse multipart form data
+            # Stream the ZIP (the whole body, or its file part for
+            # multipart form data) to disk as it arrives
             content_type = self.headers.get('Content-Type', '')
-            zip_data = None
-
-            if 'multipart/form-data' in content_type:
-                boundary = content_type.split('boundary=')[1] if 'boundary=' in content_type else None
-                if boundary:
-                    boundary_bytes = f'--{boundary}'.encode()
-                    parts = body.split(boundary_bytes)
-                    for part in parts:
-                        if b'filename=' in part and b'.zip' in part.lower():
-                            data_start = part.find(b'\r\n\r\n')
-                            if data_start != -1:
-                                zip_data = part[data_start + 4:].rstrip(b'\r\n--')
-                                break
-            else:
-                zip_data = body
-
-            if zip_data is None:
-                self.send_json({"error": "No ZIP file found"}, 400)
-                return
-
-            # Grade based on challenge type
-            self.log_message(f"Grading {challenge}: {student_id} ({len(zip_data)} bytes)")
-
-            if challenge == 'edge-proto':
-                result = grade_edge_proto(zip_data, student_id)
-            else:
-                result = grade_frontend(zip_data, student_id)
+            work_dir = EDGE_PROTO_WORK_DIR if challenge == 'edge-proto' else None
+            with tempfile.NamedTemporaryFile(prefix='upload-', suffix='.zip', dir=work_dir) as upload:
+                if 'multipart/form-data' in content_type:
+                    boundary = content_type.split('boundary=')[1] if 'boundary=' in content_type else None
+                    found = bool(boundary) and parse_multipart_stream(
+                        self.rfile, boundary.encode(), content_length, upload)
+                else:
+                    found = True
+                    copy_stream(self.rfile, upload, content_length)
+
+                if not found:
+                    self.send_json({"error": "No ZIP file found"}, 400)
+                    return
+                upload.flush()
+
+                # Grade based on challenge type
+                self.log_message(f"Grading {challenge}: {student_id} ({upload.tell()} bytes)")
+
+                zip_path = Path(upload.name)
+                if challenge == 'edge-proto':
+                    with GRADING_SEM:
+                        result = grade_edge_proto(zip_path, student_id)
+                else:
+                    with FRONTEND_GRADING_LOCK, GRADING_SEM:
+                        result = grade_frontend(zip_path, student_id)
 
             # Save to database
             save_submission(student_id, challenge, client_ip, result)
@@ -1095,8 +1991,9 @@ class GradingHandler(BaseHTTPRequestHandler):
         else:
             self.send_json({"error": "Not found"}, 404)
 
-    def get_web_ui(self) -> str:
-        return """<!DOCTYPE html>
+
+# Landing page: static, so encoded (and gzipped) once at import
+WEB_UI_HTML = """<!DOCTYPE html>
 <html>
 <head>
     <title>Unified Grading Server</title>
@@ -1222,6 +2119,8 @@ GET /results/:id     - Student results (requires API key)
     </script>
 </body>
 </html>"""
+_WEB_UI_BODY = WEB_UI_HTML.encode('utf-8')
+_WEB_UI_GZIP = gzip.compress(_WEB_UI_BODY, 9)
 
 
 # =============================================================================
@@ -1250,9 +2149,7 @@ def main():
         print(f"\nYour API key: {key}\n")
         print("Save this key! You'll need it to submit.\n")
 
-    # Initialize sandbox
-    global SANDBOX_TOOL
-    SANDBOX_TOOL = detect_sandbox_tool()
+    # Sandbox tool was detected once at import
     print("\n[SECURITY] Sandbox Configuration:")
     print(f"  Sandbox enabled: {SANDBOX_ENABLED}")
     if SANDBOX_TOOL:
@@ -1273,6 +2170,8 @@ def main():
 
     if FRONTEND_DIR.exists():
         print(f"[OK] Frontend challenge: {FRONTEND_DIR}")
+        if not NODE_AVAILABLE:
+            print("[WARN] Node.js/npm not found on PATH: frontend submissions will fail")
     else:
         print(f"[WARN] Frontend not found: {FRONTEND_DIR}")
 
@@ -1282,9 +2181,10 @@ def main():
 
     # Initialize database
     init_database()
+    NPM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
     # Start server
-    server = HTTPServer((args.host, args.port), GradingHandler)
+    server = ThreadingHTTPServer((args.host, args.port), GradingHandler)
 
     print("=" * 60)
     print("Unified Grading Server")
@@ -1307,11 +2207,24 @@ def main():
     print("Press Ctrl+C to stop")
     print("=" * 60)
 
+    db_writer.start()
+    rate_limiter.start_sweeper()
+
+    # Install the frontend grader's packages and browser in the background;
+    # a frontend submission arriving first waits for it to finish
+    if FRONTEND_DIR.exists() and NODE_AVAILABLE:
+        threading.Thread(target=prewarm_grader, name="grader-prewarm", daemon=True).start()
+
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         print("\nShutting down...")
         server.shutdown()
+    finally:
+        rate_limiter.stop_sweeper()
+        mock_api_server.stop()
+        shutdown_scan_executor()
+        db_writer.close()
 
 
 if __name__ == '__main__':
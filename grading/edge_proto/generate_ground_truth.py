@@ -6,12 +6,46 @@ This script parses the hidden test data and generates expected JSON outputs
 that will be used to grade candidate submissions.
 """
 
+import hashlib
+import io
 import json
+import mmap
+import multiprocessing
+import os
 import sys
+from contextlib import contextmanager
 from pathlib import Path
 from typing import Dict, List, Tuple
 from collections import Counter
 
+try:
+    import blake3
+except ImportError:  # optional; cache keys fall back to hashlib.sha256
+    blake3 = None
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; falls back to json.dumps
+    orjson = None
+
+# Congestion values are tallied in batches of this many rows, so the counting
+# runs inside Counter.update without keeping a whole column in memory
+CONGESTION_BATCH = 64 * 1024
+
+# parse_log_line results for skipped lines, which are not worth a warning
+QUIET_ERRORS = frozenset(("empty line", "comment line"))
+
+# Bump whenever calculate_stats changes its results, so cached stats from
+# older runs are ignored
+STATS_CACHE_VERSION = 1
+
+
+def json_dumps(data) -> bytes:
+    """Serialize to UTF-8 JSON indented by two spaces, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode('utf-8')
+
 
 def parse_log_line(line: str, line_num: int) -> Tuple[Dict, str]:
     """
@@ -60,6 +94,93 @@ def parse_log_line(line: str, line_num: int) -> Tuple[Dict, str]:
         return None, f"parsing error: {str(e)}"
 
 
+@contextmanager
+def map_log_file(log_file: Path):
+    """Map a log file read-only for one sequential pass over its lines."""
+    with open(log_file, 'rb') as f:
+        # mmap refuses zero-length files
+        if os.fstat(f.fileno()).st_size == 0:
+            yield io.BytesIO()
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            yield mm
+
+
+def parse_buffer(buf: mmap.mmap) -> Tuple[int, int, int, Counter, List[Tuple[int, str]]]:
+    """
+    Parse a mapped log file one line at a time, keeping running totals.
+
+    Nothing is stored per valid line: the request, error and RTT totals
+    are plain ints updated in the loop, and congestion values are tallied
+    in batches.
+
+    Returns:
+        (total_requests, error_count, total_rtt, congestion_counts, warnings)
+        - warnings holds (line_num, error) for every rejected line other
+        than empty/comment
+    """
+    total_requests = 0
+    error_count = 0
+    total_rtt = 0
+    congestion_counts = Counter()
+    congestion_col = []
+    warnings = []
+
+    for line_num, line in enumerate(iter(buf.readline, b''), 1):
+        # Skip comment lines. The first byte settles almost every line: only
+        # a printable ASCII one is certain to survive strip(), so anything
+        # else (blank, indented, \x1c or NBSP padding...) is left to
+        # parse_log_line; the fields the stats read never need a strip()
+        first = line[:1]
+        if first == b'#':
+            continue
+        if b'!' <= first <= b'~':
+            # Stats only read the first ten fields, so v1.0 and v1.1 lines
+            # share one path; anything past the 10th separator stays unsplit
+            parts = line.split(b',', 9)
+
+            # Fast path: integer fields that are plain ASCII digits
+            if (len(parts) == 10 and parts[1].isdigit() and parts[4].isdigit()
+                    and parts[5].isdigit() and parts[6].isdigit() and parts[7].isdigit()):
+                total_requests += 1
+                # A 3-digit status compares like its value, so the usual case
+                # needs no int(); only rtt_ms has to be converted
+                status = parts[4]
+                error_count += (status >= b'400') if len(status) == 3 else (int(status) >= 400)
+                total_rtt += int(parts[7])
+                congestion_col.append(parts[8])
+                if len(congestion_col) == CONGESTION_BATCH:
+                    congestion_counts.update(congestion_col)
+                    congestion_col.clear()
+                continue
+
+        # Anything else (padded or short lines, signs, non-ASCII digits) goes
+        # through parse_log_line so it is accepted or rejected exactly as before
+        data, error = parse_log_line(line.decode('utf-8'), line_num)
+        if data is None:
+            # Blank and comment lines land here too; those stay silent
+            if error not in QUIET_ERRORS:
+                warnings.append((line_num, error))
+            continue
+
+        total_requests += 1
+        error_count += data['status'] >= 400
+        total_rtt += data['rtt_ms']
+        congestion_col.append(data['congestion'].encode('utf-8'))
+
+    congestion_counts.update(congestion_col)
+    return total_requests, error_count, total_rtt, congestion_counts, warnings
+
+
+def print_warnings(warnings: List[Tuple[int, str]]):
+    """Report rejected lines (consistent with challenge requirements, they are skipped)."""
+    for line_num, error in warnings:
+        print(f"  Warning line {line_num}: {error}", file=sys.stderr)
+
+
 def calculate_stats(log_file: Path) -> Dict:
     """
     Calculate statistics from a log file.
@@ -67,46 +188,70 @@ def calculate_stats(log_file: Path) -> Dict:
     Returns:
         Dictionary with total_requests, error_rate, avg_rtt_ms, top_congestion
     """
-    valid_requests = []
-    congestion_counts = Counter()
+    stats, warnings = summarize_log(log_file)
+    print_warnings(warnings)
+    return stats
 
-    with open(log_file, 'r', encoding='utf-8') as f:
-        for line_num, line in enumerate(f, 1):
-            data, error = parse_log_line(line, line_num)
 
-            if data is None:
-                # Skip invalid lines (consistent with challenge requirements)
-                if error and not error.startswith("empty") and not error.startswith("comment"):
-                    print(f"  Warning line {line_num}: {error}", file=sys.stderr)
-                continue
+def summarize_log(log_file: Path) -> Tuple[Dict, List[Tuple[int, str]]]:
+    """
+    calculate_stats without the reporting, so it can run in a worker process.
 
-            valid_requests.append(data)
-            congestion_counts[data['congestion']] += 1
+    Returns:
+        (stats, warnings) - warnings as returned by parse_buffer
+    """
+    with map_log_file(log_file) as buf:
+        total_requests, error_count, total_rtt, congestion_counts, warnings = parse_buffer(buf)
 
-    if not valid_requests:
+    if not total_requests:
         return {
             'total_requests': 0,
             'error_rate': 0.0,
             'avg_rtt_ms': 0.0,
             'top_congestion': ''
-        }
+        }, warnings
 
     # Calculate metrics
-    total_requests = len(valid_requests)
-    error_count = sum(1 for r in valid_requests if r['status'] >= 400)
     error_rate = error_count / total_requests if total_requests > 0 else 0.0
-
-    total_rtt = sum(r['rtt_ms'] for r in valid_requests)
     avg_rtt_ms = total_rtt / total_requests if total_requests > 0 else 0.0
 
-    top_congestion = congestion_counts.most_common(1)[0][0] if congestion_counts else ''
+    top_congestion = congestion_counts.most_common(1)[0][0].decode('utf-8') if congestion_counts else ''
 
     return {
         'total_requests': total_requests,
         'error_rate': round(error_rate, 2),
         'avg_rtt_ms': round(avg_rtt_ms, 1),
         'top_congestion': top_congestion
-    }
+    }, warnings
+
+
+def file_digest(path: Path) -> str:
+    """Content hash of a file, used to key the stats cache."""
+    digest = blake3.blake3() if blake3 is not None else hashlib.sha256()
+    # hashlib.file_digest would do this, but needs Python 3.11
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+def load_stats_cache(cache_file: Path) -> Dict[str, Dict]:
+    """Load cached stats keyed by file digest; stale or unreadable caches are empty."""
+    try:
+        with open(cache_file, 'r') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(cache, dict) or cache.get('version') != STATS_CACHE_VERSION:
+        return {}
+    return cache.get('stats', {})
+
+
+def save_stats_cache(cache_file: Path, stats_by_digest: Dict[str, Dict]):
+    """Write the stats cache next to the ground truth."""
+    with open(cache_file, 'wb') as f:
+        f.write(json_dumps({'version': STATS_CACHE_VERSION, 'stats': stats_by_digest}))
 
 
 def main():
@@ -117,6 +262,7 @@ def main():
     repo_root = script_dir.parent.parent
     hidden_data_dir = repo_root / 'edge-proto-challenge' / 'data' / 'hidden'
     output_file = script_dir / 'expected_results.json'
+    cache_file = script_dir / '_cache.json'
 
     if not hidden_data_dir.exists():
         print(f"Error: Hidden data directory not found: {hidden_data_dir}")
@@ -127,6 +273,8 @@ def main():
     print()
 
     results = {}
+    cached_stats = load_stats_cache(cache_file)
+    fresh_stats = {}
 
     # Process each dataset
     datasets = [
@@ -135,16 +283,39 @@ def main():
         'edge_proto_v1_1_C.log'
     ]
 
+    # Hash every log up front; only the ones that changed need parsing
+    found = []
     for dataset_name in datasets:
         log_file = hidden_data_dir / dataset_name
-
-        if not log_file.exists():
+        digest = file_digest(log_file) if log_file.exists() else None
+        found.append((dataset_name, log_file, digest))
+
+    changed = [log_file for _, log_file, digest in found if digest is not None and digest not in cached_stats]
+
+    # Logs are independent and parsing is CPU-bound, so parse them in
+    # parallel; reporting stays in order
+    workers = min(len(changed), os.cpu_count() or 1)
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            parsed = dict(zip(changed, pool.map(summarize_log, changed)))
+    else:
+        parsed = {log_file: summarize_log(log_file) for log_file in changed}
+
+    for dataset_name, log_file, digest in found:
+        if digest is None:
             print(f"Warning: {dataset_name} not found, skipping")
             continue
 
         print(f"Processing {dataset_name}...")
-        stats = calculate_stats(log_file)
+
+        if log_file in parsed:
+            stats, warnings = parsed[log_file]
+            print_warnings(warnings)
+        else:
+            stats = cached_stats[digest]
+            print("  (unchanged, using cached stats)")
         results[dataset_name] = stats
+        fresh_stats[digest] = stats
 
         print(f"  total_requests: {stats['total_requests']}")
         print(f"  error_rate: {stats['error_rate']}")
@@ -153,8 +324,11 @@ def main():
         print()
 
     # Save results
-    with open(output_file, 'w') as f:
-        json.dump(results, f, indent=2)
+    with open(output_file, 'wb') as f:
+        f.write(json_dumps(results))
+
+    if fresh_stats != cached_stats:
+        save_stats_cache(cache_file, fresh_stats)
 
     print(f"Ground truth saved to: {output_file}")
     print("\nYou can now use grader.py to test candidate submissions.")
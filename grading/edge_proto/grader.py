@@ -19,16 +19,56 @@ Usage:
 
 Example:
     python grader.py ../../submissions/candidate_123/
+
+Successful candidate runs are cached under ~/.cache/edge_proto_grader and
+reused while the submission files, the input log and the command are all
+unchanged. Set EDGE_PROTO_GRADER_CACHE to use another directory, or to an
+empty string to disable the cache.
+
+Set EDGE_PROTO_GRADER_BATCH=1 to first offer Python submissions the batch
+protocol (see run_candidate_batch), which grades all datasets with a single
+interpreter start.
 """
 
+import hashlib
 import json
+import os
 import subprocess
 import sys
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import shutil
 
+try:
+    import orjson
+except ImportError:  # optional speed-up; falls back to json.loads
+    orjson = None
+
+# Cached candidate runs, keyed by submission contents, input and command
+_run_cache_setting = os.environ.get('EDGE_PROTO_GRADER_CACHE', str(Path.home() / '.cache' / 'edge_proto_grader'))
+RUN_CACHE_DIR = Path(_run_cache_setting) if _run_cache_setting else None
+
+# Try the --batch protocol before one process per dataset (Python only)
+BATCH_RUNS = os.environ.get('EDGE_PROTO_GRADER_BATCH', '') not in ('', '0')
+
+
+def json_loads(data):
+    """
+    Parse JSON from str or bytes, with orjson when it is installed.
+
+    orjson is stricter than json (no NaN/Infinity, no integers past 64
+    bits), so output it rejects gets a second try with json before it
+    counts as invalid.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
 
 class Colors:
     """ANSI color codes for terminal output."""
@@ -40,6 +80,15 @@ class Colors:
     BOLD = '\033[1m'
 
 
+def scan_dir(directory: Path) -> Dict[str, os.DirEntry]:
+    """List a directory once, by entry name; empty if it cannot be read."""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name: entry for entry in entries}
+    except OSError:
+        return {}
+
+
 def find_executable(submission_dir: Path) -> Optional[Tuple[str, List[str]]]:
     """
     Detect how to run the candidate's program.
@@ -52,31 +101,32 @@ def find_executable(submission_dir: Path) -> Optional[Tuple[str, List[str]]]:
         Go: compiled binary named 'edge_proto_tool' or 'main'
     """
 
-    # Try Python module structure
-    python_patterns = [
-        submission_dir / 'edge_proto_tool' / 'main.py',
-        submission_dir / 'src' / 'edge_proto_tool' / 'main.py',
-        submission_dir / 'main.py',
-    ]
+    # One scandir per directory level; entries already know their type
+    top = scan_dir(submission_dir)
 
-    for py_file in python_patterns:
-        if py_file.exists():
-            # Determine the module path
-            if 'edge_proto_tool' in str(py_file):
-                return ('python', ['python3', '-m', 'edge_proto_tool.main'])
-            else:
-                return ('python', ['python3', str(py_file)])
+    def is_dir(entries, name):
+        return name in entries and entries[name].is_dir()
 
-    # Try Go binary
-    go_patterns = [
-        submission_dir / 'edge_proto_tool',
-        submission_dir / 'main',
-        submission_dir / 'bin' / 'edge_proto_tool',
-    ]
+    def is_file(entries, name):
+        return name in entries and entries[name].is_file()
 
-    for go_binary in go_patterns:
-        if go_binary.exists() and go_binary.is_file():
-            return ('go', [str(go_binary)])
+    package = scan_dir(submission_dir / 'edge_proto_tool') if is_dir(top, 'edge_proto_tool') else {}
+    src = scan_dir(submission_dir / 'src') if is_dir(top, 'src') else {}
+    src_package = scan_dir(submission_dir / 'src' / 'edge_proto_tool') if is_dir(src, 'edge_proto_tool') else {}
+
+    # Try Python module structure
+    if is_file(package, 'main.py') or is_file(src_package, 'main.py'):
+        return ('python', ['python3', '-m', 'edge_proto_tool.main'])
+    if is_file(top, 'main.py'):
+        return ('python', ['python3', str(submission_dir / 'main.py')])
+
+    # Try Go binary
+    if is_file(top, 'edge_proto_tool'):
+        return ('go', [str(submission_dir / 'edge_proto_tool')])
+    if is_file(top, 'main'):
+        return ('go', [str(submission_dir / 'main')])
+    if is_dir(top, 'bin') and is_file(scan_dir(submission_dir / 'bin'), 'edge_proto_tool'):
+        return ('go', [str(submission_dir / 'bin' / 'edge_proto_tool')])
 
     return None
 
@@ -113,7 +163,7 @@ def run_candidate_program(
 
         # Try to parse JSON from stdout
         try:
-            parsed = json.loads(stdout)
+            parsed = json_loads(stdout)
             return parsed, stdout, stderr
         except json.JSONDecodeError as e:
             return None, stdout, f"{stderr}\nJSON parse error: {str(e)}"
@@ -124,6 +174,115 @@ def run_candidate_program(
         return None, "", f"Execution error: {str(e)}"
 
 
+def run_candidate_batch(
+    command_parts: List[str],
+    input_files: List[Path],
+    working_dir: Path,
+    timeout: int = 30
+) -> Optional[List[Tuple[Optional[Dict], str, str]]]:
+    """
+    Run the candidate once for several input files via its --batch mode.
+
+    The program is started with --batch, reads one input path per line on
+    stdin and writes one JSON object per line to stdout, in the same order.
+    Its stderr cannot be split per file, so every result carries all of it.
+
+    Returns:
+        One (parsed_json, stdout, stderr) per input file, or None if the
+        program does not speak the protocol (non-zero exit, wrong number of
+        lines, invalid JSON, timeout) and should be run once per file instead
+    """
+    try:
+        result = subprocess.run(
+            command_parts + ['--batch'],
+            input=''.join(f"{input_file}\n" for input_file in input_files),
+            cwd=working_dir,
+            capture_output=True,
+            text=True,
+            timeout=timeout * len(input_files)
+        )
+    except (subprocess.TimeoutExpired, OSError):
+        return None
+
+    if result.returncode != 0:
+        return None
+
+    lines = [line for line in result.stdout.splitlines() if line.strip()]
+    if len(lines) != len(input_files):
+        return None
+
+    try:
+        return [(json_loads(line), line, result.stderr) for line in lines]
+    except ValueError:
+        return None
+
+
+def submission_fingerprint(submission_dir: Path) -> str:
+    """
+    Hash the path, size and mtime of every file in a submission.
+
+    Bytecode caches are left out, since running a Python submission
+    rewrites them.
+    """
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(submission_dir):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        for name in sorted(files):
+            path = Path(root) / name
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            digest.update(f"{path.relative_to(submission_dir)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def run_candidate_program_cached(
+    command_parts: List[str],
+    input_file: Path,
+    working_dir: Path,
+    fingerprint: Optional[str],
+    timeout: int = 30
+) -> Tuple[Optional[Dict], str, str]:
+    """
+    run_candidate_program, reusing the result of an identical earlier run.
+
+    Only successful runs are cached; failures and timeouts may be transient
+    and are always retried. A None fingerprint disables the cache.
+    """
+    if RUN_CACHE_DIR is None or fingerprint is None:
+        return run_candidate_program(command_parts, input_file, working_dir, timeout)
+
+    key = hashlib.sha256(json.dumps([command_parts, fingerprint]).encode())
+    content = hashlib.sha256()
+    with open(input_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            content.update(chunk)
+    key.update(content.digest())
+    cache_file = RUN_CACHE_DIR / f"{key.hexdigest()}.json"
+
+    try:
+        with open(cache_file, 'r') as f:
+            cached = json.load(f)
+        return cached['parsed'], cached['stdout'], cached['stderr']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    parsed, stdout, stderr = run_candidate_program(command_parts, input_file, working_dir, timeout)
+
+    if parsed is not None:
+        try:
+            RUN_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump({'parsed': parsed, 'stdout': stdout, 'stderr': stderr}, f)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            pass
+
+    return parsed, stdout, stderr
+
+
 def compare_results(
     actual: Dict,
     expected: Dict,
@@ -144,6 +303,10 @@ def compare_results(
             'avg_rtt_ms': 0.5,     # ±0.5ms
         }
 
+    # Passing submissions usually match exactly; skip the per-field checks
+    if actual == expected:
+        return 100.0, dict.fromkeys(('total_requests', 'error_rate', 'avg_rtt_ms', 'top_congestion'), True)
+
     field_results = {}
     total_fields = 4
     correct_fields = 0
@@ -322,46 +485,70 @@ def main():
     total_score = 0
     max_score = 100
 
-    for dataset_name, max_points, is_dataset_d in datasets:
-        input_file = hidden_data_dir / dataset_name
-
-        if dataset_name not in expected_results:
-            print(f"\n{Colors.YELLOW}⚠ Skipping {dataset_name}: no expected results{Colors.RESET}")
-            continue
+    fingerprint = submission_fingerprint(submission_dir) if RUN_CACHE_DIR is not None else None
 
-        expected = expected_results[dataset_name]
-
-        # Run the program
-        result, stdout, stderr = run_candidate_program(
+    graded = [dataset_name for dataset_name, _, _ in datasets if dataset_name in expected_results]
+    batch_runs = None
+    if BATCH_RUNS and language == 'python' and graded:
+        outcomes = run_candidate_batch(
             command_parts,
-            input_file,
+            [hidden_data_dir / dataset_name for dataset_name in graded],
             submission_dir
         )
-
-        if result is None:
-            print_test_result(
-                dataset_name, False, 0, None, expected, None, stderr,
-                0, max_points, is_dataset_d
-            )
-            continue
-
-        if is_dataset_d:
-            # Special grading for Dataset D
-            points, actual_total = grade_dataset_d(result, expected)
-            total_score += points
-            print_test_result(
-                dataset_name, True, 0, result, expected, None, stderr,
-                points, max_points, True
-            )
-        else:
-            # Normal grading for A/B/C
-            score_pct, field_results = compare_results(result, expected)
-            dataset_score = (score_pct / 100) * max_points
-            total_score += dataset_score
-            print_test_result(
-                dataset_name, True, score_pct, result, expected, field_results, stderr,
-                dataset_score, max_points, False
+        if outcomes is not None:
+            batch_runs = dict(zip(graded, outcomes))
+            print(f"{Colors.GREEN}✓{Colors.RESET} Ran all datasets in one --batch process")
+
+    # The candidate runs are independent subprocesses, so start them all at
+    # once; results are still scored and printed in dataset order
+    with ThreadPoolExecutor(max_workers=len(datasets)) as executor:
+        runs = {
+            dataset_name: executor.submit(
+                run_candidate_program_cached,
+                command_parts,
+                hidden_data_dir / dataset_name,
+                submission_dir,
+                fingerprint
             )
+            for dataset_name in graded
+            if batch_runs is None
+        }
+
+        for dataset_name, max_points, is_dataset_d in datasets:
+            if dataset_name not in expected_results:
+                print(f"\n{Colors.YELLOW}⚠ Skipping {dataset_name}: no expected results{Colors.RESET}")
+                continue
+
+            expected = expected_results[dataset_name]
+            if batch_runs is not None:
+                result, stdout, stderr = batch_runs[dataset_name]
+            else:
+                result, stdout, stderr = runs[dataset_name].result()
+
+            if result is None:
+                print_test_result(
+                    dataset_name, False, 0, None, expected, None, stderr,
+                    0, max_points, is_dataset_d
+                )
+                continue
+
+            if is_dataset_d:
+                # Special grading for Dataset D
+                points, actual_total = grade_dataset_d(result, expected)
+                total_score += points
+                print_test_result(
+                    dataset_name, True, 0, result, expected, None, stderr,
+                    points, max_points, True
+                )
+            else:
+                # Normal grading for A/B/C
+                score_pct, field_results = compare_results(result, expected)
+                dataset_score = (score_pct / 100) * max_points
+                total_score += dataset_score
+                print_test_result(
+                    dataset_name, True, score_pct, result, expected, field_results, stderr,
+                    dataset_score, max_points, False
+                )
 
     # Summary
     print("\n" + "=" * 70)
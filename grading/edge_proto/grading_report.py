@@ -13,13 +13,86 @@ Usage:
     python grading_report.py <submission_dir> [--output report.json]
 """
 
+import asyncio
+import io
 import json
+import os
+import re
+import select
 import subprocess
 import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields as dataclass_fields
+
+try:
+    import orjson
+except ImportError:  # optional speed-up; falls back to json.dumps
+    orjson = None
+
+# Shared with the plain grader next to this script
+from grader import find_executable, json_loads, submission_fingerprint
+
+
+# A submission containing this file can run as one long-lived --serve process
+SERVE_MARKER = '.serve_supported'
+
+# Dataset configuration: (file name, version, category, points)
+DATASETS = (
+    ('edge_proto_v1_A.log', 'v1.0', 'correctness', 20),
+    ('edge_proto_v1_B.log', 'v1.0', 'correctness', 30),
+    ('edge_proto_v1_1_C.log', 'v1.1', 'correctness', 36),
+    ('edge_proto_v1_1_D.log', 'v1.1', 'robustness', 14),
+)
+
+# Fields scored on the correctness datasets; numeric ones listed in
+# TOLERANCE may be off by up to that much
+GRADED_FIELDS = ('total_requests', 'error_rate', 'avg_rtt_ms', 'top_congestion')
+TOLERANCE = {
+    'error_rate': 0.01,
+    'avg_rtt_ms': 0.5,
+}
+
+# Input paths for DATASETS, per hidden data directory (see dataset_inputs)
+_input_cache: Dict[Path, List[str]] = {}
+
+# Successful candidate runs in this process, oldest first (see run_candidate_program_cached)
+RUN_CACHE_SIZE = 256
+_run_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_run_cache_lock = threading.Lock()
+
+# Letter grade for each 10-point band of the percentage (0-9, 10-19, ... 90-99)
+GRADE_BY_DECILE = "FFFFFFDCBA"
+
+GRADE_DESCRIPTIONS = {
+    "A": "Excellent - Demonstrates mastery of log parsing and robust error handling",
+    "B": "Good - Solid implementation with minor issues",
+    "C": "Satisfactory - Meets basic requirements but has notable gaps",
+    "D": "Passing - Minimum acceptable, significant improvement needed",
+    "F": "Fail - Does not meet minimum requirements"
+}
+
+# Candidates that mention this on stderr get credit for reporting bad lines
+_WARNING_RE = re.compile(rb'warning', re.IGNORECASE)
+
+# Pieces of the text report; _BARS[n] is a 10-cell bar with n cells filled
+_EQ = "=" * 70 + "\n"
+_DASH = "-" * 70 + "\n"
+_BARS = tuple("█" * n + "░" * (10 - n) for n in range(11))
+
+# What to suggest when a field is wrong on more than one dataset
+FIELD_RECOMMENDATIONS = {
+    "total_requests": "Review bad line detection logic - some valid/invalid lines may be miscounted",
+    "error_rate": "Check error rate calculation - ensure 4xx/5xx status codes are correctly identified",
+    "avg_rtt_ms": "Verify RTT averaging - check for off-by-one errors or incorrect rounding",
+    "top_congestion": "Review congestion algorithm counting logic",
+}
 
 
 @dataclass
@@ -78,28 +151,17 @@ class GradingReport:
 
 def calculate_grade(percentage: float) -> str:
     """Calculate letter grade from percentage."""
-    if percentage >= 90:
+    # Out-of-range (and NaN) scores never reach the table
+    if percentage >= 100:
         return "A"
-    elif percentage >= 80:
-        return "B"
-    elif percentage >= 70:
-        return "C"
-    elif percentage >= 60:
-        return "D"
-    else:
+    if not percentage >= 0:
         return "F"
+    return GRADE_BY_DECILE[int(percentage) // 10]
 
 
 def get_grade_description(grade: str) -> str:
     """Get description for grade."""
-    descriptions = {
-        "A": "Excellent - Demonstrates mastery of log parsing and robust error handling",
-        "B": "Good - Solid implementation with minor issues",
-        "C": "Satisfactory - Meets basic requirements but has notable gaps",
-        "D": "Passing - Minimum acceptable, significant improvement needed",
-        "F": "Fail - Does not meet minimum requirements"
-    }
-    return descriptions.get(grade, "Unknown")
+    return GRADE_DESCRIPTIONS.get(grade, "Unknown")
 
 
 def analyze_strengths_weaknesses(dataset_results: List[DatasetResult]) -> tuple:
@@ -108,7 +170,10 @@ def analyze_strengths_weaknesses(dataset_results: List[DatasetResult]) -> tuple:
     weaknesses = []
     recommendations = []
 
-    # Check each dataset
+    # Check each dataset, tallying field-level issues and warning output
+    # on the same walk
+    field_issues = Counter()
+    has_any_warnings = False
     for result in dataset_results:
         if result.percentage == 100:
             if result.category == "correctness":
@@ -120,29 +185,18 @@ def analyze_strengths_weaknesses(dataset_results: List[DatasetResult]) -> tuple:
         elif result.percentage < 50:
             weaknesses.append(f"Poor performance on {result.dataset_name} ({result.percentage:.0f}%)")
 
-    # Check field-level issues
-    field_issues = {}
-    for result in dataset_results:
-        for field in result.field_results:
-            if not field.is_correct:
-                if field.field_name not in field_issues:
-                    field_issues[field.field_name] = 0
-                field_issues[field.field_name] += 1
+        field_issues.update(field.field_name for field in result.field_results if not field.is_correct)
+        if result.has_warnings:
+            has_any_warnings = True
 
     for field, count in field_issues.items():
         if count > 1:
             weaknesses.append(f"Recurring issue with '{field}' field ({count} datasets)")
-            if field == "total_requests":
-                recommendations.append("Review bad line detection logic - some valid/invalid lines may be miscounted")
-            elif field == "error_rate":
-                recommendations.append("Check error rate calculation - ensure 4xx/5xx status codes are correctly identified")
-            elif field == "avg_rtt_ms":
-                recommendations.append("Verify RTT averaging - check for off-by-one errors or incorrect rounding")
-            elif field == "top_congestion":
-                recommendations.append("Review congestion algorithm counting logic")
+            recommendation = FIELD_RECOMMENDATIONS.get(field)
+            if recommendation:
+                recommendations.append(recommendation)
 
     # Check warning output
-    has_any_warnings = any(r.has_warnings for r in dataset_results)
     if has_any_warnings:
         strengths.append("Program outputs warnings for invalid lines (good practice)")
     else:
@@ -153,89 +207,115 @@ def analyze_strengths_weaknesses(dataset_results: List[DatasetResult]) -> tuple:
 
 def generate_text_report(report: GradingReport) -> str:
     """Generate human-readable text report."""
-    lines = []
+    out = io.StringIO()
+    w = out.write
 
     # Header
-    lines.append("=" * 70)
-    lines.append("EDGE-PROTO CHALLENGE - GRADING REPORT")
-    lines.append("=" * 70)
-    lines.append(f"Candidate: {report.candidate_id}")
-    lines.append(f"Date: {report.timestamp}")
-    lines.append("")
+    w(_EQ)
+    w("EDGE-PROTO CHALLENGE - GRADING REPORT\n")
+    w(_EQ)
+    w(f"Candidate: {report.candidate_id}\n")
+    w(f"Date: {report.timestamp}\n\n")
 
     # Overall Score
-    lines.append("-" * 70)
-    lines.append("OVERALL SCORE")
-    lines.append("-" * 70)
-    lines.append(f"  Total: {report.total_score:.1f} / {report.max_score:.0f} ({report.percentage:.1f}%)")
-    lines.append(f"  Grade: {report.grade} - {get_grade_description(report.grade)}")
-    lines.append(f"  Status: {'PASSED' if report.passed else 'FAILED'}")
-    lines.append("")
+    w(_DASH)
+    w("OVERALL SCORE\n")
+    w(_DASH)
+    w(f"  Total: {report.total_score:.1f} / {report.max_score:.0f} ({report.percentage:.1f}%)\n")
+    w(f"  Grade: {report.grade} - {get_grade_description(report.grade)}\n")
+    w(f"  Status: {'PASSED' if report.passed else 'FAILED'}\n\n")
 
     # Score Breakdown
-    lines.append("-" * 70)
-    lines.append("SCORE BREAKDOWN")
-    lines.append("-" * 70)
+    w(_DASH)
+    w("SCORE BREAKDOWN\n")
+    w(_DASH)
 
     correctness_pct = (report.correctness_score / report.correctness_max * 100) if report.correctness_max > 0 else 0
     robustness_pct = (report.robustness_score / report.robustness_max * 100) if report.robustness_max > 0 else 0
 
-    lines.append(f"  Correctness:  {report.correctness_score:5.1f} / {report.correctness_max:5.0f}  ({correctness_pct:5.1f}%)")
-    lines.append(f"  Robustness:   {report.robustness_score:5.1f} / {report.robustness_max:5.0f}  ({robustness_pct:5.1f}%)")
-    lines.append("")
+    w(f"  Correctness:  {report.correctness_score:5.1f} / {report.correctness_max:5.0f}  ({correctness_pct:5.1f}%)\n")
+    w(f"  Robustness:   {report.robustness_score:5.1f} / {report.robustness_max:5.0f}  ({robustness_pct:5.1f}%)\n\n")
 
     # Per-Dataset Results
-    lines.append("-" * 70)
-    lines.append("DATASET RESULTS")
-    lines.append("-" * 70)
+    w(_DASH)
+    w("DATASET RESULTS\n")
+    w(_DASH)
 
     for result in report.dataset_results:
         status = "✓" if result.percentage == 100 else ("◐" if result.percentage >= 50 else "✗")
         bar_filled = int(result.percentage / 10)
-        bar = "█" * bar_filled + "░" * (10 - bar_filled)
+        bar = _BARS[bar_filled] if 0 <= bar_filled <= 10 else "█" * bar_filled + "░" * (10 - bar_filled)
 
-        lines.append(f"\n  {result.dataset_name} ({result.version}, {result.category})")
-        lines.append(f"    Score: {result.points_earned:.1f} / {result.points_possible:.0f}  [{bar}] {result.percentage:.0f}%")
+        w(f"\n  {result.dataset_name} ({result.version}, {result.category})\n")
+        w(f"    Score: {result.points_earned:.1f} / {result.points_possible:.0f}  [{bar}] {result.percentage:.0f}%\n")
 
         if not result.execution_success:
-            lines.append(f"    {status} Program failed to execute")
+            w(f"    {status} Program failed to execute\n")
         elif result.field_results:
             for field in result.field_results:
                 field_status = "✓" if field.is_correct else "✗"
-                lines.append(f"    {field_status} {field.field_name}: expected={field.expected}, actual={field.actual}")
+                w(f"    {field_status} {field.field_name}: expected={field.expected}, actual={field.actual}\n")
 
-    lines.append("")
+    w("\n")
 
     # Strengths
     if report.strengths:
-        lines.append("-" * 70)
-        lines.append("STRENGTHS")
-        lines.append("-" * 70)
+        w(_DASH)
+        w("STRENGTHS\n")
+        w(_DASH)
         for s in report.strengths:
-            lines.append(f"  ✓ {s}")
-        lines.append("")
+            w(f"  ✓ {s}\n")
+        w("\n")
 
     # Weaknesses
     if report.weaknesses:
-        lines.append("-" * 70)
-        lines.append("AREAS FOR IMPROVEMENT")
-        lines.append("-" * 70)
-        for w in report.weaknesses:
-            lines.append(f"  • {w}")
-        lines.append("")
+        w(_DASH)
+        w("AREAS FOR IMPROVEMENT\n")
+        w(_DASH)
+        for weakness in report.weaknesses:
+            w(f"  • {weakness}\n")
+        w("\n")
 
     # Recommendations
     if report.recommendations:
-        lines.append("-" * 70)
-        lines.append("RECOMMENDATIONS")
-        lines.append("-" * 70)
+        w(_DASH)
+        w("RECOMMENDATIONS\n")
+        w(_DASH)
         for r in report.recommendations:
-            lines.append(f"  → {r}")
-        lines.append("")
+            w(f"  → {r}\n")
+        w("\n")
+
+    # No newline after the closing rule
+    w(_EQ[:-1])
 
-    lines.append("=" * 70)
+    return out.getvalue()
+
+
+def to_dict(obj):
+    """Convert dataclasses (and lists of them) to plain dicts for json."""
+    # One walk over the fields; asdict would deep-copy the tree first
+    if hasattr(obj, '__dataclass_fields__'):
+        return {f.name: to_dict(getattr(obj, f.name)) for f in dataclass_fields(obj)}
+    elif isinstance(obj, list):
+        return [to_dict(item) for item in obj]
+    else:
+        return obj
 
-    return "\n".join(lines)
+
+def generate_json_report(report: GradingReport) -> bytes:
+    """
+    Serialize the report as indented JSON.
+
+    orjson (when installed) reads the dataclasses directly; anything it
+    refuses, such as integers past 64 bits in a candidate's answer, goes
+    through json instead.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(report, option=orjson.OPT_INDENT_2)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(to_dict(report), indent=2).encode()
 
 
 def run_candidate_program(
@@ -244,13 +324,17 @@ def run_candidate_program(
     working_dir: Path,
     timeout: int = 30
 ) -> tuple:
-    """Run the candidate's program on an input file."""
+    """
+    Run the candidate's program on an input file.
+
+    Output stays as bytes: stdout goes straight to the JSON parser, and
+    stderr is decoded by the caller only where it is reported.
+    """
     try:
         result = subprocess.run(
             command_parts + [str(input_file)],
             cwd=working_dir,
             capture_output=True,
-            text=True,
             timeout=timeout
         )
 
@@ -261,101 +345,193 @@ def run_candidate_program(
             return None, stdout, stderr
 
         try:
-            parsed = json.loads(stdout)
+            parsed = json_loads(stdout)
             return parsed, stdout, stderr
-        except json.JSONDecodeError as e:
-            return None, stdout, f"{stderr}\nJSON parse error: {str(e)}"
+        except ValueError as e:
+            return None, stdout, stderr + f"\nJSON parse error: {str(e)}".encode()
 
     except subprocess.TimeoutExpired:
-        return None, "", f"Program timed out after {timeout} seconds"
+        return None, b"", f"Program timed out after {timeout} seconds".encode()
     except Exception as e:
-        return None, "", f"Execution error: {str(e)}"
+        return None, b"", f"Execution error: {str(e)}".encode()
 
 
-def find_executable(submission_dir: Path):
-    """Detect how to run the candidate's program."""
-    python_patterns = [
-        submission_dir / 'edge_proto_tool' / 'main.py',
-        submission_dir / 'src' / 'edge_proto_tool' / 'main.py',
-        submission_dir / 'main.py',
-    ]
+def run_candidate_program_cached(
+    command_parts: List[str],
+    input_file: str,
+    working_dir: Path,
+    fingerprint: str,
+    timeout: int = 30
+) -> tuple:
+    """
+    run_candidate_program, remembered for re-grading within one process.
 
-    for py_file in python_patterns:
-        if py_file.exists():
-            if 'edge_proto_tool' in str(py_file):
-                return ('python', ['python3', '-m', 'edge_proto_tool.main'])
-            else:
-                return ('python', ['python3', str(py_file)])
+    Runs are keyed by the command, the submission fingerprint and the input
+    file's mtime and size, so editing the submission or the log invalidates
+    them. Only successful runs are kept; failures are always retried.
+    """
+    try:
+        st = os.stat(input_file)
+    except OSError:
+        return run_candidate_program(command_parts, input_file, working_dir, timeout)
+
+    key = (tuple(command_parts), str(working_dir), fingerprint, str(input_file), st.st_mtime_ns, st.st_size)
+    with _run_cache_lock:
+        run = _run_cache.get(key)
+        if run is not None:
+            _run_cache.move_to_end(key)
+            return run
+
+    run = run_candidate_program(command_parts, input_file, working_dir, timeout)
+    if run[0] is not None:
+        with _run_cache_lock:
+            _run_cache[key] = run
+            if len(_run_cache) > RUN_CACHE_SIZE:
+                _run_cache.popitem(last=False)
+    return run
+
+
+def read_exactly(stream, size: int, deadline: float) -> bytes:
+    """Read exactly size bytes from a pipe, failing at EOF or once deadline (monotonic) passes."""
+    fd = stream.fileno()
+    chunks = []
+    while size:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+            raise TimeoutError("no response before the deadline")
+        chunk = os.read(fd, size)
+        if not chunk:
+            raise EOFError("candidate closed its output")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def run_candidate_server(
+    command_parts: List[str],
+    input_files: List[str],
+    working_dir: Path,
+    timeout: int = 30
+) -> Optional[List[tuple]]:
+    """
+    Run the candidate once in --serve mode for several input files.
+
+    The program reads one input path per line on stdin and answers each with
+    a 4-byte big-endian length followed by that many bytes of JSON; every
+    answer gets the usual per-run timeout. Its stderr cannot be split per
+    file, so every result carries all of it.
+
+    Returns:
+        One (parsed_json, stdout, stderr) per input file, or None if the
+        server failed in any way and the files should be run one by one
+    """
+    try:
+        proc = subprocess.Popen(
+            command_parts + ['--serve'],
+            cwd=working_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=0
+        )
+    except OSError:
+        return None
 
-    go_patterns = [
-        submission_dir / 'edge_proto_tool',
-        submission_dir / 'main',
-        submission_dir / 'bin' / 'edge_proto_tool',
-    ]
+    # Drain stderr on the side so a chatty candidate cannot block on it
+    stderr_chunks = []
+    drain = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+    drain.start()
 
-    for go_binary in go_patterns:
-        if go_binary.exists() and go_binary.is_file():
-            return ('go', [str(go_binary)])
+    answers = []
+    try:
+        for input_file in input_files:
+            proc.stdin.write(f"{input_file}\n".encode())
+            deadline = time.monotonic() + timeout
+            size = int.from_bytes(read_exactly(proc.stdout, 4, deadline), 'big')
+            payload = read_exactly(proc.stdout, size, deadline)
+            answers.append((json_loads(payload), payload))
+    except (OSError, EOFError, ValueError):
+        answers = None
+    finally:
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        drain.join(timeout=5)
 
-    return None
+    if answers is None:
+        return None
 
+    stderr = b''.join(stderr_chunks)
+    return [(parsed, stdout, stderr) for parsed, stdout in answers]
 
-def grade_submission(submission_dir: Path, expected_results: Dict, hidden_data_dir: Path) -> GradingReport:
-    """Grade a submission and generate a detailed report."""
 
-    candidate_id = submission_dir.name
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def dataset_inputs(hidden_data_dir: Path) -> List[str]:
+    """Input file paths for DATASETS under hidden_data_dir, built once per directory."""
+    inputs = _input_cache.get(hidden_data_dir)
+    if inputs is None:
+        inputs = _input_cache[hidden_data_dir] = [str(hidden_data_dir / name) for name, _, _, _ in DATASETS]
+    return inputs
 
-    executable_info = find_executable(submission_dir)
-    if executable_info is None:
-        # Return a failed report
-        return GradingReport(
-            candidate_id=candidate_id,
-            timestamp=timestamp,
-            total_score=0,
-            max_score=100,
-            percentage=0,
-            grade="F",
-            passed=False,
-            correctness_score=0,
-            correctness_max=86,
-            robustness_score=0,
-            robustness_max=14,
-            dataset_results=[],
-            strengths=[],
-            weaknesses=["Could not find executable program in submission"],
-            recommendations=["Ensure edge_proto_tool/main.py exists for Python or compiled binary for Go"]
-        )
 
-    language, command_parts = executable_info
+@lru_cache(maxsize=8)
+def _load_expected_results(path: str, mtime_ns: int, size: int) -> Dict:
+    with open(path, 'rb') as f:
+        return json_loads(f.read())
 
-    # Dataset configuration
-    datasets = [
-        ('edge_proto_v1_A.log', 'v1.0', 'correctness', 20),
-        ('edge_proto_v1_B.log', 'v1.0', 'correctness', 30),
-        ('edge_proto_v1_1_C.log', 'v1.1', 'correctness', 36),
-        ('edge_proto_v1_1_D.log', 'v1.1', 'robustness', 14),
-    ]
 
-    tolerance = {
-        'error_rate': 0.01,
-        'avg_rtt_ms': 0.5,
-    }
+def load_expected_results(expected_file: Path) -> Dict:
+    """
+    Load an expected results file, parsing each version of it only once.
+
+    Callers share the returned dict, so it must not be modified.
+    """
+    st = expected_file.stat()
+    return _load_expected_results(str(expected_file), st.st_mtime_ns, st.st_size)
+
+
+def missing_executable_report(candidate_id: str, timestamp: str) -> GradingReport:
+    """The failed report for a submission with no program to run."""
+    return GradingReport(
+        candidate_id=candidate_id,
+        timestamp=timestamp,
+        total_score=0,
+        max_score=100,
+        percentage=0,
+        grade="F",
+        passed=False,
+        correctness_score=0,
+        correctness_max=86,
+        robustness_score=0,
+        robustness_max=14,
+        dataset_results=[],
+        strengths=[],
+        weaknesses=["Could not find executable program in submission"],
+        recommendations=["Ensure edge_proto_tool/main.py exists for Python or compiled binary for Go"]
+    )
+
 
+def build_report(candidate_id: str, timestamp: str, runs: List[tuple], expected_results: Dict) -> GradingReport:
+    """Score one (parsed_json, stdout, stderr) run per dataset in DATASETS."""
     dataset_results = []
     total_score = 0
     correctness_score = 0
     robustness_score = 0
 
-    for dataset_name, version, category, max_points in datasets:
-        input_file = hidden_data_dir / dataset_name
+    for (dataset_name, version, category, max_points), run in zip(DATASETS, runs):
         expected = expected_results.get(dataset_name, {})
 
-        result, stdout, stderr = run_candidate_program(
-            command_parts, input_file, submission_dir
-        )
+        result, stdout, stderr = run
 
-        has_warnings = stderr and 'warning' in stderr.lower()
+        # Search the raw bytes, and decode only the part that is kept: 500
+        # characters of UTF-8 fit in 2000 bytes
+        has_warnings = _WARNING_RE.search(stderr) is not None
+        stderr_output = stderr[:2000].decode('utf-8', 'replace')[:500]
 
         if result is None:
             # Execution failed
@@ -368,7 +544,7 @@ def grade_submission(submission_dir: Path, expected_results: Dict, hidden_data_d
                 percentage=0,
                 field_results=[],
                 execution_success=False,
-                stderr_output=stderr[:500] if stderr else "",
+                stderr_output=stderr_output,
                 has_warnings=False
             ))
             continue
@@ -404,7 +580,7 @@ def grade_submission(submission_dir: Path, expected_results: Dict, hidden_data_d
                 percentage=(points / max_points * 100) if max_points > 0 else 0,
                 field_results=field_results,
                 execution_success=True,
-                stderr_output=stderr[:500] if stderr else "",
+                stderr_output=stderr_output,
                 has_warnings=has_warnings
             ))
         else:
@@ -412,13 +588,12 @@ def grade_submission(submission_dir: Path, expected_results: Dict, hidden_data_d
             field_results = []
             correct_count = 0
 
-            fields = ['total_requests', 'error_rate', 'avg_rtt_ms', 'top_congestion']
-            for field in fields:
+            for field in GRADED_FIELDS:
                 expected_val = expected.get(field)
                 actual_val = result.get(field)
 
-                if field in tolerance:
-                    is_correct = abs(float(actual_val or 0) - float(expected_val or 0)) <= tolerance[field]
+                if field in TOLERANCE:
+                    is_correct = abs(float(actual_val or 0) - float(expected_val or 0)) <= TOLERANCE[field]
                 else:
                     is_correct = actual_val == expected_val
 
@@ -448,7 +623,7 @@ def grade_submission(submission_dir: Path, expected_results: Dict, hidden_data_d
                 percentage=(points / max_points * 100) if max_points > 0 else 0,
                 field_results=field_results,
                 execution_success=True,
-                stderr_output=stderr[:500] if stderr else "",
+                stderr_output=stderr_output,
                 has_warnings=has_warnings
             ))
 
@@ -479,6 +654,107 @@ def grade_submission(submission_dir: Path, expected_results: Dict, hidden_data_d
     )
 
 
+def grade_submission(submission_dir: Path, expected_results: Dict, hidden_data_dir: Path) -> GradingReport:
+    """Grade a submission and generate a detailed report."""
+
+    candidate_id = submission_dir.name
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    executable_info = find_executable(submission_dir)
+    if executable_info is None:
+        return missing_executable_report(candidate_id, timestamp)
+
+    language, command_parts = executable_info
+
+    input_files = dataset_inputs(hidden_data_dir)
+
+    # Submissions that opt in answer every dataset from one process
+    runs = None
+    if (submission_dir / SERVE_MARKER).is_file():
+        runs = run_candidate_server(command_parts, input_files, submission_dir)
+
+    if runs is None:
+        # The candidate runs are independent subprocesses, so run them all
+        # at once; grading still walks the datasets in order
+        fingerprint = submission_fingerprint(submission_dir)
+        with ThreadPoolExecutor(max_workers=len(input_files)) as executor:
+            runs = list(executor.map(
+                lambda input_file: run_candidate_program_cached(command_parts, input_file, submission_dir, fingerprint),
+                input_files
+            ))
+
+    return build_report(candidate_id, timestamp, runs, expected_results)
+
+
+async def run_candidate_program_async(
+    command_parts: List[str],
+    input_file: str,
+    working_dir: Path,
+    timeout: int = 30
+) -> tuple:
+    """run_candidate_program on the running event loop, with the same results."""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *command_parts, str(input_file),
+            cwd=working_dir,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            return None, b"", f"Program timed out after {timeout} seconds".encode()
+
+        if proc.returncode != 0:
+            return None, stdout, stderr
+
+        try:
+            return json_loads(stdout), stdout, stderr
+        except ValueError as e:
+            return None, stdout, stderr + f"\nJSON parse error: {str(e)}".encode()
+
+    except Exception as e:
+        return None, b"", f"Execution error: {str(e)}".encode()
+
+
+async def grade_many(
+    submission_dirs: List[Path],
+    expected_results: Dict,
+    hidden_data_dir: Path,
+    max_running: Optional[int] = None
+) -> List[GradingReport]:
+    """
+    Grade many submissions from one event loop, reports in input order.
+
+    At most max_running candidate processes (default: twice the CPU count)
+    run at once across all submissions. Every dataset is a separate run
+    here; the --serve protocol and the run cache are only used by
+    grade_submission.
+    """
+    limit = asyncio.Semaphore(max_running or 2 * (os.cpu_count() or 1))
+    input_files = dataset_inputs(hidden_data_dir)
+
+    async def run(command_parts, input_file, submission_dir):
+        async with limit:
+            return await run_candidate_program_async(command_parts, input_file, submission_dir)
+
+    async def grade(submission_dir):
+        candidate_id = submission_dir.name
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        executable_info = find_executable(submission_dir)
+        if executable_info is None:
+            return missing_executable_report(candidate_id, timestamp)
+
+        language, command_parts = executable_info
+        runs = await asyncio.gather(*(run(command_parts, input_file, submission_dir) for input_file in input_files))
+        return build_report(candidate_id, timestamp, runs, expected_results)
+
+    return await asyncio.gather(*(grade(submission_dir) for submission_dir in submission_dirs))
+
+
 def main():
     if len(sys.argv) < 2:
         print("Usage: python grading_report.py <submission_dir> [--output report.json]")
@@ -504,8 +780,7 @@ def main():
         print("Error: expected_results.json not found")
         sys.exit(1)
 
-    with open(expected_file, 'r') as f:
-        expected_results = json.load(f)
+    expected_results = load_expected_results(expected_file)
 
     # Find hidden data
     repo_root = script_dir.parent.parent
@@ -523,17 +798,8 @@ def main():
 
     # Optionally save JSON
     if output_file:
-        # Convert dataclasses to dict
-        def to_dict(obj):
-            if hasattr(obj, '__dataclass_fields__'):
-                return {k: to_dict(v) for k, v in asdict(obj).items()}
-            elif isinstance(obj, list):
-                return [to_dict(item) for item in obj]
-            else:
-                return obj
-
-        with open(output_file, 'w') as f:
-            json.dump(to_dict(report), f, indent=2)
+        with open(output_file, 'wb') as f:
+            f.write(generate_json_report(report))
         print(f"\nJSON report saved to: {output_file}")
 
 